@@ -1,14 +1,41 @@
 from backend.grid import Grid
 from backend.cpts import CPT
 from backend.gamelogic import GameLogic
+from backend.batched import BatchedGameLogic
 from backend.bayesian import BayesianInference
+from backend.posterior_cache import PosteriorCache
 from backend.observations import Observations
+from backend.belief import LinearBelief, LogBelief
+from backend.config import SensorConfig, load_config
+from backend.advisor import SurveyAdvisor
+from backend.predictive import PredictiveMaps
+from backend.planner import SurveyPlanner
+from backend.pyramid import ProbabilityPyramid
+from backend.profiling import Profiler, PROFILER
+from backend.snapshot import save_game, load_game
+from backend.eventlog import EventLog, read_events
 
 __all__ = [
     'Position',
     'Grid',
     'CPT',
     'GameLogic',
+    'BatchedGameLogic',
     'BayesianInference',
+    'PosteriorCache',
     'Observations',
+    'LinearBelief',
+    'LogBelief',
+    'SensorConfig',
+    'load_config',
+    'SurveyAdvisor',
+    'PredictiveMaps',
+    'SurveyPlanner',
+    'ProbabilityPyramid',
+    'Profiler',
+    'PROFILER',
+    'save_game',
+    'load_game',
+    'EventLog',
+    'read_events',
 ]
\ No newline at end of file
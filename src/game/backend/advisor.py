@@ -0,0 +1,75 @@
+import numpy as np
+from backend.grid import Grid
+from backend.predictive import PredictiveMaps, xlogx
+
+
+class SurveyAdvisor:
+    """
+    Ranks every (cell, sensor) survey by its expected reduction of the
+    posterior entropy. Every predictive term is a Manhattan convolution of a
+    posterior map with a CPT kernel, computed board-wide by PredictiveMaps
+    """
+    def __init__(self, grid: Grid, maps: PredictiveMaps = None):
+        self.grid = grid
+        self.maps = maps if maps is not None else PredictiveMaps(grid)
+        self.sensor_types = list(grid.sensors)
+
+
+    def expected_entropies(self, posterior: np.ndarray, sensor_type: str) -> np.ndarray:
+        """
+        Return E[H(A | readings + new reading)] for surveying every cell with a sensor
+        """
+        plogp = xlogx(posterior)
+
+        # P(r | c), sum_a p L log p and sum_a p L log L for every reading r and cell c
+        z = self.maps.reading_maps(posterior, sensor_type)
+        s1 = self.maps.convolve(plogp, sensor_type)
+        s2 = self.maps.convolve(posterior, sensor_type, "entropy")
+
+        return np.sum(xlogx(z) - s1 - s2, axis=0)
+
+
+    def expected_gains(self, posterior: np.ndarray) -> dict:
+        """
+        Return {sensor: [rows, cols] expected entropy reduction}
+        """
+        entropy = -np.sum(xlogx(posterior))
+        return {
+            sensor_type: np.maximum(entropy - self.expected_entropies(posterior, sensor_type), 0.0)
+            for sensor_type in self.sensor_types
+        }
+
+
+    def rank(self, posterior: np.ndarray, per_cost: bool = True, budget=None, top=None) -> list:
+        """
+        Return the surveys sorted by expected information gain (per cost unit
+        if per_cost), best first. Sensors costing more than `budget` are left out.
+        Each survey is scored as fresh evidence, even where it would overwrite
+        an earlier reading of the same cell and sensor
+        """
+        gains = self.expected_gains(posterior)
+        sensor_types = [s for s in self.sensor_types
+                        if budget is None or self.grid.sensors[s].get_cost() <= budget]
+        if not sensor_types:
+            return []
+
+        costs = np.array([self.grid.sensors[s].get_cost() for s in sensor_types], dtype=float)
+        stacked = np.stack([gains[s] for s in sensor_types])
+        scores = stacked / costs[:, None, None] if per_cost else stacked
+
+        order = np.argsort(-scores, axis=None, kind="stable")
+        if top is not None:
+            order = order[:top]
+        k, rows, cols = np.unravel_index(order, scores.shape)
+
+        return [
+            {
+                'row': int(i),
+                'col': int(j),
+                'sensor': sensor_types[s],
+                'gain': float(stacked[s, i, j]),
+                'cost': int(costs[s]),
+                'score': float(scores[s, i, j]),
+            }
+            for s, i, j in zip(k, rows, cols)
+        ]
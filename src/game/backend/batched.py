@@ -0,0 +1,231 @@
+import numpy as np
+from backend.grid import Grid
+from backend.streams import GameStreams
+
+UNIFORM_CHUNK = 64
+
+
+def game_stream(rows: int, columns: int, seed: int, sensor_types: list):
+    """
+    Return the artifact (x, y) and the per-sensor generators of
+    GameLogic(rows, columns, seed, budget), from the same GameStreams
+    """
+    streams = GameStreams(seed)
+    rng = streams.artifact()
+    x = rng.integers(rows)
+    y = rng.integers(columns)
+    return (int(x), int(y)), [streams.sensor(sensor_type).generator for sensor_type in sensor_types]
+
+
+class BatchedGameLogic:
+    """
+    B independent games held as stacked arrays and stepped together.
+    Game b reproduces GameLogic(rows, columns, seeds[b], budget) surveyed
+    with the same actions
+    """
+    def __init__(self, rows: int, columns: int, seeds, budget: int, config_path=None):
+        self.grid = Grid(config_path)
+        self.grid.set_grid(rows, columns)
+        self.rows = self.grid.rows
+        self.columns = self.grid.columns
+        self.seeds = np.atleast_1d(np.asarray(seeds))
+        self.size = len(self.seeds)
+
+        self.sensor_types = list(self.grid.sensors)
+        self.sensor_index = dict(self.grid.sensor_index)
+        self.costs = np.array([self.grid.sensors[s].get_cost() for s in self.sensor_types])
+        self.set_tables()
+
+        self.artifacts = np.zeros((self.size, 2), dtype=np.int64)
+        self.rngs = []
+        for b, seed in enumerate(self.seeds):
+            (x, y), rngs = game_stream(self.rows, self.columns, int(seed), self.sensor_types)
+            self.artifacts[b] = (x, y)
+            self.rngs.append(rngs)
+        self.uniforms = np.empty((self.size, len(self.sensor_types), UNIFORM_CHUNK))
+        self.uniform_index = np.full((self.size, len(self.sensor_types)), UNIFORM_CHUNK)
+
+        self.prior = np.array(self.grid.priors)
+        self.posteriors = np.broadcast_to(self.prior, (self.size, self.rows, self.columns)).copy()
+        self.readings = np.full((self.size, len(self.sensor_types), self.rows, self.columns), -1, dtype=np.int8)
+        self.budgets = np.full(self.size, budget, dtype=np.int64)
+        self.scores = np.zeros(self.size, dtype=np.int64)
+        self.survey_counts = np.zeros(self.size, dtype=np.int64)
+        self.game_over = np.zeros(self.size, dtype=bool)
+
+        self.row_index = np.arange(self.rows)
+        self.col_index = np.arange(self.columns)
+
+
+    def set_tables(self):
+        """
+        Stack the compiled CPTs of all sensors into padded arrays:
+        cdf [S, D+1, R] for sampling and likelihood [S, max grid distance+1, R]
+        """
+        sensors = [self.grid.sensors[s] for s in self.sensor_types]
+        n_readings = max(len(sensor.labels) for sensor in sensors)
+        depth = max(sensor.max_distance for sensor in sensors)
+        grid_distance = (self.rows - 1) + (self.columns - 1)
+
+        self.n_readings = np.array([len(sensor.labels) for sensor in sensors])
+        self.max_distances = np.array([sensor.max_distance for sensor in sensors])
+        self.cdf = np.ones((len(sensors), depth + 1, n_readings))
+        self.likelihood = np.zeros((len(sensors), grid_distance + 1, n_readings))
+        for k, sensor in enumerate(sensors):
+            n = len(sensor.labels)
+            self.cdf[k, :sensor.max_distance + 1, :n] = sensor.cdf
+            rows = np.minimum(np.arange(grid_distance + 1), sensor.max_distance)
+            self.likelihood[k, :, :n] = sensor.table[rows]
+
+
+    def sensor_codes(self, sensors) -> np.ndarray:
+        """
+        Map sensor names (or codes) to sensor codes
+        """
+        sensors = np.broadcast_to(np.asarray(sensors), (self.size,))
+        if sensors.dtype.kind in "iu":
+            return sensors.astype(np.int64)
+        return np.array([self.sensor_index[s] for s in sensors], dtype=np.int64)
+
+
+    def survey(self, rows, cols, sensors, active=None):
+        """
+        Survey (rows[b], cols[b]) with sensors[b] in every active game.
+        Return (reading codes, success mask, costs); games that were skipped
+        (inactive, over, or out of funds) get reading -1 and cost 0
+        """
+        rows = np.broadcast_to(np.asarray(rows, dtype=np.int64), (self.size,))
+        cols = np.broadcast_to(np.asarray(cols, dtype=np.int64), (self.size,))
+        sensors = self.sensor_codes(sensors)
+
+        costs = self.costs[sensors]
+        success = ~self.game_over & (self.budgets >= costs)
+        if active is not None:
+            success &= np.asarray(active, dtype=bool)
+        games = np.flatnonzero(success)
+
+        codes = np.full(self.size, -1, dtype=np.int64)
+        if len(games) == 0:
+            return codes, success, np.where(success, costs, 0)
+
+        r, c, s = rows[games], cols[games], sensors[games]
+        self.budgets[games] -= costs[games]
+
+        distance = (np.abs(self.artifacts[games, 0] - r) + np.abs(self.artifacts[games, 1] - c))
+        rolls = self.next_uniforms(games, s)
+        cdf = self.cdf[s, np.minimum(distance, self.max_distances[s])]
+        drawn = np.sum(cdf <= rolls[:, None], axis=1)
+        drawn = np.minimum(drawn, self.n_readings[s] - 1)
+        codes[games] = drawn
+
+        previous = self.readings[games, s, r, c].astype(np.int64)
+        self.readings[games, s, r, c] = drawn
+        self.survey_counts[games] += 1
+
+        changed = previous != drawn
+        self._update_posteriors(games[changed], r[changed], c[changed], s[changed],
+                                drawn[changed], previous[changed])
+
+        return codes, success, np.where(success, costs, 0)
+
+
+    def _update_posteriors(self, games, r, c, s, codes, previous):
+        """
+        Fold the new readings into the posteriors of `games`, dividing out the
+        readings they overwrote
+        """
+        if len(games) == 0:
+            return
+
+        distance = (np.abs(self.row_index[None, :, None] - r[:, None, None]) +
+                    np.abs(self.col_index[None, None, :] - c[:, None, None]))
+        every_game = len(games) == self.size
+        posterior = self.posteriors if every_game else self.posteriors[games]
+
+        replaced = previous >= 0
+        divisible = np.all(self.likelihood[s, :, np.maximum(previous, 0)] > 0, axis=1)
+        divide = replaced & divisible
+        rebuild = replaced & ~divisible
+
+        if np.any(divide):
+            posterior[divide] /= self._gather(s[divide], previous[divide], distance[divide])
+        if np.any(rebuild):
+            keep = ~rebuild
+            posterior[keep] *= self._gather(s[keep], codes[keep], distance[keep])
+            for k in np.flatnonzero(rebuild):
+                # A zero can't be divided back out, rebuild from the prior instead
+                posterior[k] = self._rebuild(games[k])
+        else:
+            posterior *= self._gather(s, codes, distance)
+
+        flat = posterior.reshape(len(games), -1)
+        total = np.sum(flat, axis=1)
+        if not np.all(total > 0):
+            raise ValueError("Posterior underflowed to zero, use the 'log' engine")
+        flat /= total[:, None]
+        if not every_game:
+            self.posteriors[games] = posterior
+
+
+    def _gather(self, s, codes, distance) -> np.ndarray:
+        """
+        Return likelihood[s[k], distance[k], codes[k]] as a [n, rows, cols] array
+        """
+        return self.likelihood[s[:, None, None], distance, codes[:, None, None]]
+
+
+    def _rebuild(self, game: int) -> np.ndarray:
+        """
+        Recompute the posterior of one game from the prior and its latest readings
+        """
+        posterior = self.prior.copy()
+        for s, r, c in zip(*np.nonzero(self.readings[game] >= 0)):
+            distance = np.abs(self.row_index - r)[:, None] + np.abs(self.col_index - c)[None, :]
+            posterior *= self.likelihood[s, :, self.readings[game, s, r, c]][distance]
+        return posterior
+
+
+    def next_uniforms(self, games: np.ndarray, sensors: np.ndarray) -> np.ndarray:
+        """
+        Take the next uniform of each game's stream for its sensor, refilling
+        the pre-drawn chunks of the streams that ran out
+        """
+        empty = self.uniform_index[games, sensors] >= UNIFORM_CHUNK
+        for b, s in zip(games[empty], sensors[empty]):
+            self.uniforms[b, s] = self.rngs[b][s].random(UNIFORM_CHUNK)
+            self.uniform_index[b, s] = 0
+
+        rolls = self.uniforms[games, sensors, self.uniform_index[games, sensors]]
+        self.uniform_index[games, sensors] += 1
+        return rolls
+
+
+    def excavate(self, rows, cols, active=None):
+        """
+        Excavate (rows[b], cols[b]) in every active game that isn't over.
+        Return (hit mask, scores)
+        """
+        rows = np.broadcast_to(np.asarray(rows, dtype=np.int64), (self.size,))
+        cols = np.broadcast_to(np.asarray(cols, dtype=np.int64), (self.size,))
+        playing = ~self.game_over
+        if active is not None:
+            playing &= np.asarray(active, dtype=bool)
+
+        hit = playing & (rows == self.artifacts[:, 0]) & (cols == self.artifacts[:, 1])
+        self.scores[playing] = np.where(hit[playing], self.budgets[playing], 0)
+        self.game_over |= playing
+
+        return hit, np.where(playing, self.scores, 0)
+
+
+    def get_reading_label(self, sensor, code: int) -> str:
+        """
+        Return the label of a reading code of a sensor (name or code)
+        """
+        if not isinstance(sensor, str):
+            sensor = self.sensor_types[sensor]
+        return self.grid.sensors[sensor].get_reading_label(code)
+
+
+    def get_probability_grid(self, game: int) -> np.ndarray:
+        return self.posteriors[game].copy()
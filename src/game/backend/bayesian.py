@@ -1,53 +1,130 @@
 import numpy as np
 from backend.grid import Grid
 from backend.observations import Observations
+from backend.belief import ENGINES
+from backend.posterior_cache import PosteriorCache
+from backend.profiling import PROFILER, profiled
 
 class BayesianInference:
-    def __init__(self, grid: Grid):
+    def __init__(self, grid: Grid, engine: str = "linear", dtype=np.float64, cache_bytes: int = 0):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown inference engine: {engine}")
+
         self.grid = grid
+        self.engine = engine
+        self.dtype = np.dtype(dtype)
         self.total_cells = self.grid.rows * self.grid.columns
         self.prior = np.zeros((self.grid.rows, self.grid.columns))
+        self.row_index = np.arange(self.grid.rows)
+        self.col_index = np.arange(self.grid.columns)
+        self.max_distance = (self.grid.rows - 1) + (self.grid.columns - 1)
+        self.likelihood_tables = {}
         self.set_prior()
+        self.belief = self.new_belief()
+        # Posteriors of earlier observation sets, off unless given a byte budget
+        self.cache = PosteriorCache(self, cache_bytes) if cache_bytes else None
     
   
     def set_prior(self):
         """
         Stores the initial prior
         """
-        for i in range(self.grid.rows):
-            for j in range(self.grid.columns):
-                self.prior[i,j] = self.grid.positions[i,j].p0
+        self.prior[...] = self.grid.priors
         
-    def compute_posterior(self, observations: Observations) -> np.ndarray:
+    @profiled("BayesianInference.compute_posterior")
+    def compute_posterior(self, observations: Observations, repeats: bool = False) -> np.ndarray:
         """
-        Computes P(A | readings)
+        Computes P(A | readings). By default only the latest reading of each
+        (cell, sensor) counts; with repeats, every logged reading does
         """
-        posterior = self.prior.copy()
-        
-        for (row, col), sensor_readings in observations.get_all_observations().items():
-            for sensor_type, reading in sensor_readings.items():
-                likelihood = self._compute_likelihood(row, col, sensor_type, reading)
-                posterior *= likelihood
+        if self.cache is not None:
+            return self.cache.posterior(observations, repeats)
+
+        belief = self.new_belief()
+        self._apply_observations(belief, observations, repeats)
         
-        total = np.sum(posterior)
-        posterior /= total
+        return belief.posterior()
+
+    def new_belief(self):
+        """
+        Return a belief of the configured engine, initialized with the prior
+        """
+        return ENGINES[self.engine](self.prior, self.dtype)
+
+    def reset(self):
+        """
+        Restart the running belief from the prior
+        """
+        self.belief = self.new_belief()
+
+    @profiled("BayesianInference.update")
+    def update(self, observations: Observations, row: int, col: int,
+               sensor_type: str, previous: str = None) -> np.ndarray:
+        """
+        Folds the latest reading of (row, col, sensor_type) into the running belief.
+        `previous` is the reading it overwrote, if any, whose likelihood is divided back out
+        """
+        reading = observations.get_observation(row, col, sensor_type)
+        if reading == previous:
+            return self.belief.posterior()
+
+        distance = self._compute_distances(row, col)
+
+        if previous is not None:
+            old_table = self._get_likelihood_table(sensor_type, previous)
+            if not self.belief.divide(old_table, distance):
+                # A zero can't be divided back out, rebuild from the prior instead
+                self.reset()
+                self._apply_observations(self.belief, observations)
+                return self.belief.posterior()
 
-            
-        return posterior
+        self.belief.multiply(self._get_likelihood_table(sensor_type, reading), distance)
+        self.belief.normalize()
+
+        return self.belief.posterior()
     
-    def _compute_likelihood(self, obs_row: int, obs_col: int, 
-                           sensor_type: str, reading: str) -> np.ndarray:
+    def _apply_observations(self, belief, observations: Observations, repeats: bool = False):
         """
-        Computes P(readings | A=(i,j)) for all cells (i,j)
+        Multiplies every observation into `belief` and normalizes it.
+        Identical readings are applied once, raised to their count
         """
-        likelihood = np.ones((self.grid.rows, self.grid.columns))
-        
-        sensor = self.grid.sensors[sensor_type]
+        entries = observations.counts(latest_only=not repeats)
+        for row, col, sensor, code, count in zip(entries['row'], entries['col'], entries['sensor'],
+                                                 entries['reading'], entries['count']):
+            sensor_type, reading = observations.decode(sensor, code)
+            table = self._get_likelihood_table(sensor_type, reading)
+            belief.multiply(table, self._compute_distances(row, col), int(count))
         
-        for i in range(self.grid.rows):
-            for j in range(self.grid.columns):
-                distance = abs(self.grid.positions[i,j].x - obs_row) + abs(self.grid.positions[i,j].y - obs_col)
-                prob = sensor.get_conditional_probability(distance, reading)
-                likelihood[i, j] = prob
-                
-        return likelihood
\ No newline at end of file
+        belief.normalize()
+
+    def likelihood(self, obs_row: int, obs_col: int, sensor_type: str, reading: str) -> np.ndarray:
+        """
+        Returns P(reading at (obs_row, obs_col) | A=(i,j)) for all cells (i,j)
+        """
+        table = self._get_likelihood_table(sensor_type, reading)
+        distance = self._compute_distances(obs_row, obs_col)
+
+        return table[distance]
+
+    def _compute_distances(self, obs_row: int, obs_col: int) -> np.ndarray:
+        """
+        Manhattan distance from (obs_row, obs_col) to every cell
+        """
+        return (np.abs(self.row_index - obs_row)[:, None] +
+                np.abs(self.col_index - obs_col)[None, :])
+
+    def _get_likelihood_table(self, sensor_type: str, reading: str) -> np.ndarray:
+        """
+        Return the P(reading | distance) table of a sensor, built once per reading
+        """
+        key = (sensor_type, reading)
+        if key not in self.likelihood_tables:
+            PROFILER.count("likelihood_table.miss")
+            with PROFILER.span("BayesianInference.likelihood_table"):
+                sensor = self.grid.sensors[sensor_type]
+                self.likelihood_tables[key] = sensor.get_likelihood_table(reading, self.max_distance)
+            PROFILER.allocated("likelihood_table", self.likelihood_tables[key])
+        else:
+            PROFILER.count("likelihood_table.hit")
+
+        return self.likelihood_tables[key]
\ No newline at end of file
@@ -0,0 +1,127 @@
+import numpy as np
+from backend.profiling import PROFILER, profiled
+
+
+class LinearBelief:
+    """
+    Belief over the artifact location stored as raw probabilities
+    """
+    def __init__(self, prior: np.ndarray, dtype=np.float64):
+        self.dtype = np.dtype(dtype)
+        self.values = np.array(prior, dtype=self.dtype)
+
+
+    def multiply(self, table: np.ndarray, distance: np.ndarray, power: int = 1):
+        """
+        Multiply in the likelihood table[distance], `power` times
+        """
+        if power != 1:
+            table = table ** power
+        likelihood = table.astype(self.dtype)[distance]
+        PROFILER.allocated("belief.likelihood", likelihood)
+        self.values *= likelihood
+
+
+    def divide(self, table: np.ndarray, distance: np.ndarray) -> bool:
+        """
+        Divide out the likelihood table[distance]. Return False if it holds zeros
+        """
+        if not np.all(table > 0):
+            return False
+        likelihood = table.astype(self.dtype)[distance]
+        PROFILER.allocated("belief.likelihood", likelihood)
+        self.values /= likelihood
+        return True
+
+
+    @profiled("belief.normalize")
+    def normalize(self):
+        """
+        Rescale the belief so it sums to one
+        """
+        total = np.sum(self.values)
+        if not total > 0:
+            raise ValueError("Posterior underflowed to zero, use the 'log' engine")
+        self.values /= total
+
+
+    def posterior(self) -> np.ndarray:
+        """
+        Return P(A | readings)
+        """
+        return self.values
+
+
+    def copy(self):
+        """
+        Return an independent copy of the belief
+        """
+        other = self.__class__.__new__(self.__class__)
+        other.dtype = self.dtype
+        other.values = self.values.copy()
+        return other
+
+
+class LogBelief(LinearBelief):
+    """
+    Belief stored as log-probabilities, normalized with log-sum-exp so that long
+    runs of small likelihoods can't underflow to zero
+    """
+    def __init__(self, prior: np.ndarray, dtype=np.float64):
+        self.dtype = np.dtype(dtype)
+        with np.errstate(divide="ignore"):
+            self.values = np.log(np.asarray(prior, dtype=self.dtype))
+
+
+    def multiply(self, table: np.ndarray, distance: np.ndarray, power: int = 1):
+        """
+        Add in the log-likelihood log(table)[distance], `power` times
+        """
+        log_table = self._log_table(table)
+        if power != 1:
+            log_table = log_table * power
+        likelihood = log_table[distance]
+        PROFILER.allocated("belief.likelihood", likelihood)
+        self.values += likelihood
+
+
+    def divide(self, table: np.ndarray, distance: np.ndarray) -> bool:
+        """
+        Subtract the log-likelihood log(table)[distance]. Return False if it holds zeros
+        """
+        if not np.all(table > 0):
+            return False
+        likelihood = self._log_table(table)[distance]
+        PROFILER.allocated("belief.likelihood", likelihood)
+        self.values -= likelihood
+        return True
+
+
+    @profiled("belief.normalize")
+    def normalize(self):
+        """
+        Shift the log-belief so it sums to one in probability space
+        """
+        peak = float(np.max(self.values))
+        if not np.isfinite(peak):
+            raise ValueError("Observations have zero probability under the sensor CPTs")
+        # Accumulate in float64 so a float32 belief keeps its precision near the peak
+        total = peak + np.log(np.sum(np.exp(self.values - peak), dtype=np.float64))
+        self.values -= total
+
+
+    def posterior(self) -> np.ndarray:
+        """
+        Return P(A | readings)
+        """
+        posterior = np.exp(self.values)
+        PROFILER.allocated("belief.posterior", posterior)
+        return posterior
+
+
+    def _log_table(self, table: np.ndarray) -> np.ndarray:
+        with np.errstate(divide="ignore"):
+            return np.log(table).astype(self.dtype)
+
+
+ENGINES = {"linear": LinearBelief, "log": LogBelief}
@@ -0,0 +1,219 @@
+import hashlib
+import json
+import os
+import zipfile
+import yaml
+import numpy as np
+from pathlib import Path
+from typing import Dict, Optional
+from backend.profiling import PROFILER, profiled
+
+CONFIG_FILE = Path(__file__).parent.parent.parent / "resources" / "probabilities.yaml"
+CACHE_SUFFIX = ".cache"
+CACHE_FORMAT = 1
+TOLERANCE = 1e-6
+
+
+class SensorConfig:
+    """
+    Parsed and validated sensor configuration (costs and CPTs) of one YAML file
+    """
+    def __init__(self, path: Path, mtime_ns: int, data: Dict):
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.costs = data["costs"]
+        self.cpts = data["cpts"]
+        self.version = None
+        self.compiled = {}
+
+
+    def compile(self):
+        """
+        Compile the CPT of every sensor, shared read-only by all CPT instances
+        """
+        for ctype, cpt in self.cpts.items():
+            compiled = compile_cpt(cpt)
+            for array in compiled[3:]:
+                array.flags.writeable = False
+            self.compiled[ctype] = compiled
+
+
+    def validate(self):
+        """
+        Check that every sensor has a cost and that every distribution sums to 1
+        """
+        for ctype, cpt in self.cpts.items():
+            if ctype not in self.costs:
+                raise ValueError(f"{self.path}: sensor {ctype} has no cost")
+            for distance, distribution in cpt.items():
+                total = sum(distribution.values())
+                if abs(total - 1.0) > TOLERANCE:
+                    raise ValueError(
+                        f"{self.path}: {ctype}[{distance}] sums to {total}, expected 1")
+
+
+class ConfigRegistry:
+    """
+    Process-wide cache of sensor configurations, keyed by file path.
+    A file is parsed again only when its modification time changes
+    """
+    def __init__(self):
+        self.configs = {}
+
+
+    def load(self, path=None, binary_cache: bool = False) -> SensorConfig:
+        """
+        Return the configuration stored in `path` (probabilities.yaml by default)
+        """
+        path = Path(path if path is not None else CONFIG_FILE).resolve()
+        mtime_ns = os.stat(path).st_mtime_ns
+
+        config = self.configs.get(path)
+        if config is not None and config.mtime_ns == mtime_ns:
+            PROFILER.count("config.hit")
+            return config
+        PROFILER.count("config.miss")
+
+        config = None
+        if binary_cache:
+            config = self._read_binary_cache(path, mtime_ns)
+        if config is None:
+            config = self._parse(path, mtime_ns)
+            if binary_cache:
+                self._write_binary_cache(config)
+
+        self.configs[path] = config
+        return config
+
+
+    def invalidate(self, path=None):
+        """
+        Forget one cached configuration, or all of them
+        """
+        if path is None:
+            self.configs.clear()
+        else:
+            self.configs.pop(Path(path).resolve(), None)
+
+
+    @profiled("config.parse")
+    def _parse(self, path: Path, mtime_ns: int) -> SensorConfig:
+        with open(path, 'rb') as f:
+            raw = f.read()
+
+        config = SensorConfig(path, mtime_ns, yaml.safe_load(raw))
+        config.validate()
+        config.compile()
+        config.version = hashlib.sha1(raw).hexdigest()
+        return config
+
+
+    def _read_binary_cache(self, path: Path, mtime_ns: int) -> Optional[SensorConfig]:
+        """
+        Return the config stored in the .npz cache next to `path`, or None if
+        it is missing, unreadable, of another format or of other YAML contents
+        """
+        try:
+            with open(path, 'rb') as f:
+                version = hashlib.sha1(f.read()).hexdigest()
+            with np.load(str(path) + CACHE_SUFFIX, allow_pickle=False) as data:
+                meta = json.loads(data['meta'].tobytes().decode())
+                if meta.get('format') != CACHE_FORMAT or meta.get('version') != version:
+                    return None
+                arrays = {name: data[name] for name in data.files if name != 'meta'}
+        except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+            return None
+
+        # JSON object keys are strings: the CPTs are stored as (distance, distribution) pairs
+        cpts = {ctype: {distance: distribution for distance, distribution in pairs}
+                for ctype, pairs in meta['cpts'].items()}
+        config = SensorConfig(path, mtime_ns, {'costs': meta['costs'], 'cpts': cpts})
+        for ctype, labels in meta['labels'].items():
+            table, cdf = arrays[f"table_{ctype}"], arrays[f"cdf_{ctype}"]
+            table.flags.writeable = False
+            cdf.flags.writeable = False
+            codes = {reading: code for code, reading in enumerate(labels)}
+            config.compiled[ctype] = (labels, codes, len(table) - 1, table, cdf)
+        config.version = version
+        return config
+
+
+    def _write_binary_cache(self, config: SensorConfig):
+        """
+        Store the compiled config as an .npz (no pickles) keyed by the YAML hash
+        """
+        meta = {
+            'format': CACHE_FORMAT,
+            'version': config.version,
+            'costs': config.costs,
+            'cpts': {ctype: list(cpt.items()) for ctype, cpt in config.cpts.items()},
+            'labels': {ctype: compiled[0] for ctype, compiled in config.compiled.items()},
+        }
+        arrays = {'meta': np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8)}
+        for ctype, compiled in config.compiled.items():
+            arrays[f"table_{ctype}"] = compiled[3]
+            arrays[f"cdf_{ctype}"] = compiled[4]
+
+        cache_file = str(config.path) + CACHE_SUFFIX
+        try:
+            with open(cache_file + ".tmp", 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(cache_file + ".tmp", cache_file)
+        except OSError:
+            pass
+
+
+def resolve_distribution(cpt: Dict, distance: int) -> Dict[str, float]:
+    """
+    Return the raw CPT entry for a distance, falling back to the default row
+    """
+    if distance in cpt:
+        return cpt[distance]
+    elif "default" in cpt:
+        return cpt["default"]
+    else:
+        numeric_keys = [k for k in cpt.keys() if isinstance(k, int)]
+        if numeric_keys:
+            last_key = max(numeric_keys)
+            return cpt[last_key]
+        else:
+            raise ValueError(f"Nenhuma distribuição encontrada para distância {distance}")
+
+
+def compile_cpt(cpt: Dict) -> tuple:
+    """
+    Compile a nested CPT dict into (labels, codes, max_distance, table, cdf).
+    table is a dense [max_distance+1, n_readings] array whose last row holds
+    the distribution used for every farther distance
+    """
+    labels = []
+    for distribution in cpt.values():
+        for reading in distribution:
+            if reading not in labels:
+                labels.append(reading)
+    codes = {reading: code for code, reading in enumerate(labels)}
+
+    numeric_keys = [k for k in cpt.keys() if isinstance(k, int)]
+    max_distance = max(numeric_keys, default=-1) + 1
+    if "default" not in cpt:
+        max_distance = max(max_distance - 1, 0)
+
+    table = np.zeros((max_distance + 1, len(labels)))
+    for distance in range(max_distance + 1):
+        for reading, p in resolve_distribution(cpt, distance).items():
+            table[distance, codes[reading]] = p
+
+    cdf = np.cumsum(table, axis=1)
+    cdf /= cdf[:, -1:]
+
+    return labels, codes, max_distance, table, cdf
+
+
+REGISTRY = ConfigRegistry()
+
+
+def load_config(path=None, binary_cache: bool = False) -> SensorConfig:
+    """
+    Return the shared sensor configuration of `path`
+    """
+    return REGISTRY.load(path, binary_cache)
@@ -1,48 +1,44 @@
-import yaml
-from pathlib import Path
 import numpy as np
 from typing import Dict
+from backend.config import load_config
 
 class CPT:
-    def __init__(self, ctype, rng=None):
+    def __init__(self, ctype, rng=None, config_path=None):
         self.type = None
         self.cost = None
         self.cpt = None
+        self.labels = None
+        self.codes = None
+        self.max_distance = None
+        self.table = None
+        self.cdf = None
+        self.version = None
 
         if rng == None:
             self.rng = np.random.default_rng()
         else:
             self.rng = rng
 
-        self.read_config(ctype)
+        self.read_config(ctype, config_path)
 
 
-    def read_config(self, ctype):
-        ifile = Path(__file__).parent.parent.parent / "resources" / "probabilities.yaml"
-        
-        with open(ifile, 'r') as f:
-            data = yaml.safe_load(f)
+    def read_config(self, ctype, config_path=None):
+        config = load_config(config_path)
 
         self.type = ctype
-        self.cost = data["costs"][ctype]
-        self.cpt = data["cpts"][ctype]
+        self.cost = config.costs[ctype]
+        self.cpt = config.cpts[ctype]
+
+        self.labels, self.codes, self.max_distance, self.table, self.cdf = config.compiled[ctype]
+        self.version = config.version
 
 
     def get_distribution(self, distance: int) -> Dict[str, float]:
         """
         Return the CPT
         """
-        if distance in self.cpt:
-            return self.cpt[distance]
-        elif "default" in self.cpt:
-            return self.cpt["default"]
-        else:
-            numeric_keys = [k for k in self.cpt.keys() if isinstance(k, int)]
-            if numeric_keys:
-                last_key = max(numeric_keys)
-                return self.cpt[last_key]
-            else:
-                raise ValueError(f"Nenhuma distribuição encontrada para distância {distance}")
+        row = self.table[min(distance, self.max_distance)]
+        return dict(zip(self.labels, row.tolist()))
             
 
     def get_reading(self, distance):
@@ -50,26 +46,65 @@ class CPT:
         Roll a random number between 0 and 1.
         Return the sensor reading based on the CPT.
         """
-
-        distribution = self.get_distribution(distance)
+        code = self.sample(distance)
         
-        readings = list(distribution.keys())
-        probabilities = list(distribution.values())
-        
-        roll = self.rng.choice(readings, p=probabilities)
-        
-        return roll
+        return self.labels[code]
+
+
+    def sample(self, distances) -> np.ndarray:
+        """
+        Draw one reading code per distance, with a single uniform roll each
+        """
+        rows = np.minimum(distances, self.max_distance)
+        rolls = self.rng.random(np.shape(rows))
+
+        cdf = self.cdf[rows]
+        # Same as searchsorted(cdf, roll, side='right') row by row
+        codes = np.sum(cdf <= np.expand_dims(rolls, -1), axis=-1)
+
+        return np.minimum(codes, len(self.labels) - 1)
 
 
     def get_conditional_probability(self, distance: int, reading: str):
         """
         Return probability given reading
         """
-        distribution = self.get_distribution(distance)
+        code = self.codes.get(reading)
+        if code is None:
+            return 0.0
+
+        return float(self.table[min(distance, self.max_distance), code])
 
-        return distribution.get(reading, 0.0)
+
+    def get_likelihood_table(self, reading: str, max_distance: int) -> np.ndarray:
+        """
+        Return P(reading | distance) for every distance in [0, max_distance]
+        """
+        code = self.codes.get(reading)
+        if code is None:
+            return np.zeros(max_distance + 1)
+
+        rows = np.minimum(np.arange(max_distance + 1), self.max_distance)
+        return self.table[rows, code]
     
 
+    def get_reading_code(self, reading: str) -> int:
+        """
+        Return the integer code of a reading label
+        """
+        try:
+            return self.codes[reading]
+        except KeyError:
+            raise ValueError(f"Leitura desconhecida para o sensor {self.type}: {reading}")
+
+
+    def get_reading_label(self, code: int) -> str:
+        """
+        Return the reading label of an integer code
+        """
+        return self.labels[code]
+
+
     def get_cost(self):
         """
         Return sensor cost
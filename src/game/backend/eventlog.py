@@ -0,0 +1,116 @@
+import os
+import numpy as np
+
+MAGIC = b"LAEVENTS"
+VERSION = 1
+HEADER_SIZE = 16
+
+SURVEY = 0
+EXCAVATE = 1
+
+# Packed fixed-width record. Excavations have sensor -1 and reading 1 if the
+# artifact was found, else 0
+RECORD = np.dtype([
+    ('game_id', '<u8'),
+    ('step', '<u4'),
+    ('action', 'u1'),
+    ('row', '<i4'),
+    ('col', '<i4'),
+    ('sensor', 'i1'),
+    ('reading', 'i1'),
+    ('cost', '<i4'),
+    ('budget', '<i4'),
+    ('max_posterior', '<f8'),
+])
+
+
+def header() -> bytes:
+    return MAGIC + np.array([VERSION, RECORD.itemsize], dtype='<u4').tobytes()
+
+
+class EventLog:
+    """
+    Append-only binary log of game events. Records are staged in a NumPy
+    buffer and written in batches; flush() or close() writes the rest
+    """
+    def __init__(self, path, buffer_size: int = 4096):
+        self.path = path
+        self.buffer = np.zeros(buffer_size, dtype=RECORD)
+        self.count = 0
+        self.file = open(path, 'ab')
+        if self.file.tell() == 0:
+            self.file.write(header())
+        else:
+            check_header(path)
+            # Drop a record torn by a crash, or every later one would be misaligned
+            size = self.file.tell()
+            whole = HEADER_SIZE + (size - HEADER_SIZE) // RECORD.itemsize * RECORD.itemsize
+            if whole != size:
+                self.file.truncate(whole)
+                self.file.seek(whole)
+
+
+    def record(self, game_id: int, step: int, action: int, row: int, col: int,
+               sensor: int, reading: int, cost: int, budget: int, max_posterior: float):
+        """
+        Stage one event, writing the buffer out when it is full
+        """
+        self.buffer[self.count] = (game_id, step, action, row, col, sensor, reading, cost, budget, max_posterior)
+        self.count += 1
+        if self.count == len(self.buffer):
+            self.flush()
+
+
+    def flush(self):
+        """
+        Write the staged records
+        """
+        if self.count:
+            self.file.write(self.buffer[:self.count].tobytes())
+            self.count = 0
+        self.file.flush()
+
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def check_header(path):
+    with open(path, 'rb') as f:
+        data = f.read(HEADER_SIZE)
+    if len(data) < HEADER_SIZE or data[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not an event log")
+    version, itemsize = np.frombuffer(data[len(MAGIC):], dtype='<u4')
+    if version != VERSION or itemsize != RECORD.itemsize:
+        raise ValueError(f"Unsupported event log version {version} in {path}")
+
+
+def read_events(path) -> np.recarray:
+    """
+    Return the records of a log as a read-only memory-mapped record array.
+    A record cut short by a crash at the end of the file is left out (and
+    dropped when the log is opened for appending again)
+    """
+    check_header(path)
+    count = (os.path.getsize(path) - HEADER_SIZE) // RECORD.itemsize
+    if count == 0:
+        return np.zeros(0, dtype=RECORD).view(np.recarray)
+    events = np.memmap(path, dtype=RECORD, mode='r', offset=HEADER_SIZE, shape=(count,))
+    return events.view(np.recarray)
+
+
+def read_event_logs(paths) -> np.recarray:
+    """
+    Return the records of several logs concatenated in memory
+    """
+    return np.concatenate([read_events(path) for path in paths]).view(np.recarray)
@@ -1,62 +1,252 @@
 from backend.grid import Grid
 from backend.observations import Observations
 from backend.bayesian import BayesianInference
+from backend.advisor import SurveyAdvisor
+from backend.planner import SurveyPlanner
+from backend.profiling import PROFILER, profiled
+from backend.eventlog import EventLog, SURVEY, EXCAVATE
+from backend.history import GameState, HISTORY_SIZE
+from collections import deque
+import copy
 import numpy as np
 
+DISPLAY_DECIMALS = 4  # probabilities are shown as percentages with 4 decimals
+
 class GameLogic:
-    def __init__(self, rows: int, columns: int, seed: int, budget: int):
-        self.grid = Grid()
-        self.grid.set_grid(rows, columns)
+    def __init__(self, rows: int, columns: int, seed: int, budget: int,
+                 engine: str = "linear", dtype=np.float64, config_path=None,
+                 event_log: EventLog = None, game_id: int = None, history: int = HISTORY_SIZE):
+        self.grid = Grid(config_path)
         self.grid.set_seed(seed)
+        self.grid.set_grid(rows, columns)
         self.budget = budget
-        self.observations = Observations()
-        self.bayesian = BayesianInference(self.grid)
+        self.observations = Observations(self.grid.sensors)
+        self.bayesian = BayesianInference(self.grid, engine, dtype)
+        self.advisor = SurveyAdvisor(self.grid)
+        self.planner = SurveyPlanner(self)
         self.game_over = False
         self.score = 0
         self.survey_history = []
         self.survey_count = 0
+        self.game_id = seed if game_id is None else game_id
+        self.event_log = event_log
+        self.displayed = self._displayed_probabilities()
+        self.dirty_cells = set()
+        self.changed_box = None
+        self.undo_states = deque(maxlen=history)
+        self.redo_states = []
+        self.shared = False  # board arrays also referenced by saved states or forks
+        self.hypothetical = False
 
+    @profiled("GameLogic.survey")
     def survey(self, row: int, col:int, sensor_type: str):
         if self.game_over:
             return "Game Over", False
+        if self.hypothetical:
+            return "Hypothetical Game, assume readings instead", False
+        
+        # Raises on a bad cell or sensor before anything is charged or saved
+        pos = self.grid.positions[row, col]
+        if sensor_type not in self.grid.sensors:
+            raise ValueError(f"Unknown sensor: {sensor_type}")
         
         cost = self.grid.sensors[sensor_type].get_cost()
         if self.budget < cost:
             return "Insuficient Funds", False
         else:
+            self._checkpoint(row, col, sensor_type)
             self.budget = self.budget - cost
-        pos = self.grid.positions[row, col]
         reading = self.grid.eval_sensor(pos, self.grid.A, sensor_type)
-        self.observations.add_observation(row, col, sensor_type, reading)
-        self._update_probabilities()
+        previous = self.observations.get_observation(row, col, sensor_type)
+        self.observations.add_observation(row, col, sensor_type, reading, self.survey_count)
+        self._update_probabilities(row, col, sensor_type, previous)
         pos.set_status(sensor_type, reading)
+        self.dirty_cells.add((row, col))
+        self._record(SURVEY, row, col, sensor_type, reading, cost)
         self.survey_count += 1
         return reading, True, cost
             
-    def _update_probabilities(self):
-        posterior = self.bayesian.compute_posterior(self.observations)
-        for i in range(self.grid.rows):
-            for j in range(self.grid.columns):
-                self.grid.positions[i, j].set_probability(posterior[i, j])
+    def assume(self, row: int, col: int, sensor_type: str, reading: str) -> np.ndarray:
+        """Applies a hypothetical reading to a fork without spending budget. Returns the posterior"""
+        if not self.hypothetical:
+            raise ValueError("Readings can only be assumed on a fork of the game")
+        self.grid.positions[row, col]
+        if sensor_type not in self.grid.sensors:
+            raise ValueError(f"Unknown sensor: {sensor_type}")
+        if reading not in self.grid.sensors[sensor_type].labels:
+            raise ValueError(f"Unknown {sensor_type} reading: {reading}")
+        
+        self._checkpoint(row, col, sensor_type)
+        previous = self.observations.get_observation(row, col, sensor_type)
+        self.observations.add_observation(row, col, sensor_type, reading, self.survey_count)
+        self._update_probabilities(row, col, sensor_type, previous)
+        self.grid.set_reading(row, col, sensor_type, reading)
+        self.dirty_cells.add((row, col))
+        return self.grid.probabilities
+    
+    def fork(self) -> "GameLogic":
+        """
+        Returns a hypothetical branch of the game to assume() readings on.
+        It shares the board arrays copy-on-write and has its own undo history
+        """
+        branch = copy.copy(self)
+        branch.grid = self.grid.copy()
+        branch.observations = copy.deepcopy(self.observations)
+        branch.bayesian = copy.copy(self.bayesian)
+        branch.bayesian.grid = branch.grid
+        branch.bayesian.belief = copy.copy(self.bayesian.belief)
+        branch.planner = SurveyPlanner(branch, self.planner.depth, self.planner.candidates, self.planner.table_size)
+        branch.survey_history = list(self.survey_history)
+        branch.event_log = None
+        branch.dirty_cells = set()
+        branch.changed_box = None
+        branch.undo_states = deque(maxlen=self.undo_states.maxlen)
+        branch.redo_states = []
+        branch.hypothetical = True
+        self.shared = branch.shared = True
+        return branch
+    
+    def undo(self) -> bool:
+        """Steps back one survey, or assumed reading. Returns False if there is none"""
+        if self.game_over or not self.undo_states:
+            return False
+        state = self.undo_states.pop()
+        current = GameState(self)
+        # The history entry of the undone step, to put back on redo
+        current.entries = self.survey_history[state.history_length:]
+        self.redo_states.append(current)
+        self._restore(state)
+        return True
+    
+    def redo(self) -> bool:
+        """Steps forward again after undo(). Returns False if there is nothing to redo"""
+        if self.game_over or not self.redo_states:
+            return False
+        self.undo_states.append(GameState(self, self.observations.key(self.observations.length)))
+        self._restore(self.redo_states.pop())
+        return True
+    
+    def _checkpoint(self, row: int, col: int, sensor_type: str):
+        """
+        Saves the state for undo before a reading of (row, col, sensor_type),
+        then copies the board arrays still shared with saved states or forks
+        """
+        if self.undo_states.maxlen:
+            self.undo_states.append(GameState(self, (row, col, self.observations.sensor_codes[sensor_type])))
+            self.shared = True
+        self.redo_states.clear()
+        if self.shared:
+            self.grid.probabilities = self.grid.probabilities.copy()
+            self.grid.readings = self.grid.readings.copy()
+            self.bayesian.belief.values = self.bayesian.belief.values.copy()
+            self.shared = False
+    
+    def _restore(self, state: GameState):
+        """Swaps a saved state in and marks every cell whose display changed"""
+        readings = self.grid.readings
+        state.restore(self)
+        rows, cols = np.nonzero(np.any(readings != self.grid.readings, axis=0))
+        self.dirty_cells.update(zip(rows.tolist(), cols.tolist()))
+        self._mark_changed_probabilities()
+        self.changed_box = (0, self.grid.rows, 0, self.grid.columns)
+    
+    def _update_probabilities(self, row: int, col: int, sensor_type: str, previous: str = None):
+        posterior = self.bayesian.update(self.observations, row, col, sensor_type, previous)
+        with PROFILER.span("GameLogic.write_probabilities"):
+            self.grid.probabilities[...] = posterior
+            self._mark_changed_probabilities()
+            self._mark_changed_box(row, col, sensor_type)
+    
+    def _displayed_probabilities(self) -> np.ndarray:
+        return np.round(self.grid.probabilities * 100, DISPLAY_DECIMALS)
+    
+    def _mark_changed_probabilities(self):
+        """Marks dirty the cells whose probability changed at display precision"""
+        displayed = self._displayed_probabilities()
+        rows, cols = np.nonzero(displayed != self.displayed)
+        self.dirty_cells.update(zip(rows.tolist(), cols.tolist()))
+        self.displayed = displayed
+    
+    def _mark_changed_box(self, row: int, col: int, sensor_type: str):
+        """
+        Outside the cells closer than the sensor's max distance the likelihood
+        is constant, so the posterior there only changes by a common factor
+        """
+        radius = self.grid.sensors[sensor_type].max_distance
+        box = (max(row - radius + 1, 0), min(row + radius, self.grid.rows),
+               max(col - radius + 1, 0), min(col + radius, self.grid.columns))
+        if box[0] >= box[1] or box[2] >= box[3]:
+            box = (row, row, col, col)
+        if self.changed_box is not None:
+            box = (min(box[0], self.changed_box[0]), max(box[1], self.changed_box[1]),
+                   min(box[2], self.changed_box[2]), max(box[3], self.changed_box[3]))
+        self.changed_box = box
+    
+    def pop_changed_box(self):
+        """
+        Returns (row0, row1, col0, col1), half-open, the box of cells whose
+        probability changed other than by a common factor since the last call
+        """
+        box, self.changed_box = self.changed_box, None
+        return box
+    
+    def pop_dirty_cells(self) -> set:
+        """Returns the cells changed since the last call and clears them"""
+        dirty, self.dirty_cells = self.dirty_cells, set()
+        return dirty
     
     def excavate(self, row: int, col: int) -> tuple[bool, int]:
+        if self.hypothetical:
+            raise ValueError("A hypothetical game can't be excavated")
         if self.game_over:
             return False, 0
         
         self.game_over = True
-        if row == self.grid.A.x and col == self.grid.A.y:
+        found = bool(row == self.grid.A.x and col == self.grid.A.y)
+        self._record(EXCAVATE, row, col, found=found)
+        if found:
             self.score = self.budget
             return True, self.score
         else:
             self.score = 0
             return False, 0
     
+    def _record(self, action: int, row: int, col: int, sensor_type: str = None,
+                reading: str = None, cost: int = 0, found: bool = False):
+        """Adds an action to survey_history and to the event log, if any"""
+        if action == SURVEY:
+            sensor = self.grid.sensor_index[sensor_type]
+            code = self.grid.sensors[sensor_type].get_reading_code(reading)
+        else:
+            sensor, code = -1, int(found)
+        self.survey_history.append({
+            'step': self.survey_count,
+            'action': 'survey' if action == SURVEY else 'excavate',
+            'row': int(row),
+            'col': int(col),
+            'sensor': sensor_type,
+            'reading': reading if action == SURVEY else found,
+            'cost': cost,
+            'budget': self.budget,
+        })
+        if self.event_log is not None:
+            self.event_log.record(self.game_id, self.survey_count, action, row, col, sensor, code,
+                                  cost, self.budget, float(np.max(self.grid.probabilities)))
+    
+    def recommend_survey(self, per_cost: bool = True, top: int = None) -> list[dict]:
+        """Ranks every affordable (cell, sensor) survey by expected information gain"""
+        if self.game_over:
+            return []
+        return self.advisor.rank(self.grid.probabilities, per_cost, self.budget, top)
+    
+    def plan_action(self, depth: int = None, time_budget: float = None) -> dict:
+        """Returns the survey or excavation that maximizes the expected score"""
+        if self.game_over:
+            return {}
+        return self.planner.plan(depth, time_budget)
+    
     def get_probability_grid(self) -> np.ndarray:
-        grid = np.zeros((self.grid.rows, self.grid.columns))
-        for i in range(self.grid.rows):
-            for j in range(self.grid.columns):
-                grid[i, j] = self.grid.positions[i, j].get_probability()
-        return grid
+        return self.grid.probabilities.copy()
     
     def get_heatmap_data(self) -> list[list[float]]:
         return self.get_probability_grid().tolist()
@@ -66,7 +256,7 @@ class GameLogic:
             'budget': self.budget,
             'score': self.score,
             'game_over': self.game_over,
-            'artifact_location': (self.artifact.x, self.artifact.y),
+            'artifact_location': (self.grid.A.x, self.grid.A.y),
             'grid_size': (self.grid.rows, self.grid.columns),
             'survey_count': self.survey_count
         }
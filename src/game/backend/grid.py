@@ -1,15 +1,25 @@
-from backend.position import Position
+from backend.position import Position, PositionGrid, NOT_USED
 from backend.cpts import CPT
+from backend.streams import GameStreams
+from backend.profiling import profiled
+import copy
 import numpy as np
 SEED = 42
 
 class Grid:
-    def __init__(self):
+    def __init__(self, config_path=None):
+        self.config_path = config_path
         self.rows = None
         self.columns = None
         self.A = None
         self.positions = None
+        self.probabilities = None
+        self.priors = None
+        self.readings = None
         self.rng = None
+        self.streams = None
+        self.sensors = {}
+        self.config_version = None
         self.gpr = None
         self.mag = None
         self.vis = None
@@ -24,11 +34,10 @@ class Grid:
         """
         self.rows = int(rows)
         self.columns = int(columns)
-        self.positions = np.empty((self.rows, self.columns), dtype=object)
-        
-        for i in range(self.rows):
-            for j in range(self.columns):
-                self.positions[i, j] = Position(i, j)
+        self.probabilities = np.zeros((self.rows, self.columns))
+        self.priors = np.zeros((self.rows, self.columns))
+        self.readings = np.full((len(self.sensors), self.rows, self.columns), -1, dtype=np.int8)
+        self.positions = PositionGrid(self)
 
         self.A = self.get_artifact()
         self.set_initial_probabilities()
@@ -45,14 +54,19 @@ class Grid:
 
     def set_seed(self, iseed=None):
         """
-        Set the randomizer seed
+        Set the game seed: the artifact generator and every sensor's stream
+        derive from it. Call before set_grid, which draws the artifact
         """
         if iseed == None:
             iseed = SEED
         try:
-            self.rng = np.random.default_rng(iseed)
+            self.streams = GameStreams(iseed)
         except (ValueError, TypeError):
-            self.rng = np.random.default_rng(SEED)
+            self.streams = GameStreams(SEED)
+        self.rng = self.streams.artifact()
+
+        for sensor_type, sensor in self.sensors.items():
+            sensor.rng = self.streams.sensor(sensor_type)
             
     
     def set_initial_probabilities(self):
@@ -61,22 +75,59 @@ class Grid:
         """        
         p = 1.0 / float(self.rows * self.columns)
         
-        for i in range(self.rows):
-            for j in range(self.columns):
-                self.positions[i,j].set_initial_state(p)
+        self.priors.fill(p)
+        self.probabilities[...] = self.priors
 
 
     def set_cpts(self):
         """
         Set the sensors
         """
-        self.gpr = CPT("GPR", self.rng)
-        self.mag = CPT("MAG", self.rng)
-        self.vis = CPT("VIS", self.rng)
+        self.gpr = CPT("GPR", self.streams.sensor("GPR"), self.config_path)
+        self.mag = CPT("MAG", self.streams.sensor("MAG"), self.config_path)
+        self.vis = CPT("VIS", self.streams.sensor("VIS"), self.config_path)
 
         self.sensors = {"GPR": self.gpr, "MAG": self.mag, "VIS": self.vis}
+        # Version of the config the sensor tables were compiled from
+        self.config_version = self.gpr.version
+        self.sensor_index = {sensor_type: k for k, sensor_type in enumerate(self.sensors)}
+
+
+    def copy(self):
+        """
+        Return a grid sharing this one's arrays, with its own position views
+        and sensor streams
+        """
+        other = copy.copy(self)
+        other.positions = PositionGrid(other)
+        other.sensors = {}
+        for sensor_type, sensor in self.sensors.items():
+            other.sensors[sensor_type] = copy.copy(sensor)
+            other.sensors[sensor_type].rng = copy.deepcopy(sensor.rng)
+        other.gpr, other.mag, other.vis = other.sensors["GPR"], other.sensors["MAG"], other.sensors["VIS"]
+        return other
+
+
+    def set_reading(self, row: int, col: int, sensor_type: str, reading: str):
+        """
+        Store the latest reading of a sensor at (row, col)
+        """
+        sensor = self.sensors[sensor_type]
+        self.readings[self.sensor_index[sensor_type], row, col] = sensor.get_reading_code(reading)
+
+
+    def get_status(self, row: int, col: int) -> dict:
+        """
+        Return the latest reading of every sensor at (row, col)
+        """
+        status = {}
+        for sensor_type, k in self.sensor_index.items():
+            code = self.readings[k, row, col]
+            status[sensor_type] = NOT_USED if code < 0 else self.sensors[sensor_type].get_reading_label(code)
+        return status
 
 
+    @profiled("Grid.eval_sensor")
     def eval_sensor(self, position: Position, target: Position, sensor_type: str) -> str:
         """
         Attributes the sensor status to the position. Return the sensor reading
@@ -0,0 +1,69 @@
+HISTORY_SIZE = 16  # undoable steps kept per game
+
+
+class GameState:
+    """
+    Everything a survey changes in a game. The board arrays are captured by
+    reference: the game copies them before its next write, so a state costs
+    no copy of its own and restoring it is a swap of references.
+    The observation log and survey_history are append-only, so their lengths
+    suffice, plus the latest index that the next reading of `key` overwrites.
+    States are one step apart, so restoring one is O(1) in the readings
+    """
+    __slots__ = ("budget", "score", "game_over", "survey_count", "history_length", "entries",
+                 "length", "latest", "streams", "probabilities", "belief", "readings")
+
+    def __init__(self, game, key: tuple = None):
+        self.budget = game.budget
+        self.score = game.score
+        self.game_over = game.game_over
+        self.survey_count = game.survey_count
+        self.history_length = len(game.survey_history)
+        self.entries = []  # survey_history entries to put back when stepping forward to this state
+        self.length = game.observations.length
+        self.latest = None if key is None else game.observations.latest.get(key)
+        self.streams = {sensor_type: (sensor.rng.buffer, sensor.rng.index, sensor.rng.generator.bit_generator.state)
+                        for sensor_type, sensor in game.grid.sensors.items()}
+        self.probabilities = game.grid.probabilities
+        self.belief = game.bayesian.belief.values
+        self.readings = game.grid.readings
+
+
+    def restore(self, game):
+        """
+        Put the game back in this state, one step before or after its current
+        one. Its arrays become shared with the state
+        """
+        observations = game.observations
+        if self.length < observations.length:
+            # Stepping back over the reading at self.length
+            key = observations.key(self.length)
+            if self.latest is None:
+                del observations.latest[key]
+            else:
+                observations.latest[key] = self.latest
+        elif self.length > observations.length:
+            # Stepping forward over the reading still logged past the end
+            observations.latest[observations.key(observations.length)] = observations.length
+        observations.length = self.length
+
+        del game.survey_history[self.history_length - len(self.entries):]
+        game.survey_history.extend(self.entries)
+
+        game.budget = self.budget
+        game.score = self.score
+        game.game_over = self.game_over
+        game.survey_count = self.survey_count
+        for sensor_type, (buffer, index, state) in self.streams.items():
+            stream = game.grid.sensors[sensor_type].rng
+            stream.buffer, stream.index = buffer, index
+            stream.generator.bit_generator.state = state
+        game.grid.probabilities = self.probabilities
+        game.bayesian.belief.values = self.belief
+        game.grid.readings = self.readings
+        game.shared = True
+
+
+    @property
+    def nbytes(self) -> int:
+        return self.probabilities.nbytes + self.belief.nbytes + self.readings.nbytes
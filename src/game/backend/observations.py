@@ -1,36 +1,173 @@
+import numpy as np
 from typing import Dict, Optional
+from backend.profiling import PROFILER
+
+INITIAL_CAPACITY = 64
+COLUMNS = {
+    'row': np.int32,
+    'col': np.int32,
+    'sensor': np.int8,
+    'reading': np.int8,
+    'step': np.int32,
+}
 
 
 class Observations:
-    def __init__(self):
+    def __init__(self, sensors: Dict = None):
         """
-        Store observations in a dictionary format:
-        {(row, col): {'GPR': 'X | FALSE', 'MAG': 'X | FALSE', 'VIS': 'X | FALSE' }}
+        Append-only log of sensor readings stored column-wise in typed arrays:
+        row, col, sensor code, reading code and step index.
+        The latest reading of each (row, col, sensor) is the current observation;
+        earlier ones stay in the log.
+
+        With `sensors` ({name: CPT}), sensor codes follow its order and reading
+        codes are the CPT codes. Otherwise labels are coded as they arrive
         """
-        self.observations = {}
-        
+        self.length = 0
+        self.data = {name: np.zeros(INITIAL_CAPACITY, dtype=dtype) for name, dtype in COLUMNS.items()}
+        self.latest = {}  # (row, col, sensor code) -> index of its latest reading
+
+        self.sensor_names = []
+        self.sensor_codes = {}
+        self.reading_labels = []
+        self.reading_codes = []
+        if sensors is not None:
+            for name, sensor in sensors.items():
+                self._add_sensor(name, list(sensor.labels))
+
+
+    def _add_sensor(self, name: str, labels: list) -> int:
+        self.sensor_codes[name] = len(self.sensor_names)
+        self.sensor_names.append(name)
+        self.reading_labels.append(labels)
+        self.reading_codes.append({label: code for code, label in enumerate(labels)})
+        return self.sensor_codes[name]
+
+
+    def encode(self, sensor_type: str, reading: str) -> tuple:
+        """Return the (sensor code, reading code) pair of a reading"""
+        sensor = self.sensor_codes.get(sensor_type)
+        if sensor is None:
+            sensor = self._add_sensor(sensor_type, [])
+        codes = self.reading_codes[sensor]
+        code = codes.get(reading)
+        if code is None:
+            code = len(self.reading_labels[sensor])
+            self.reading_labels[sensor].append(reading)
+            codes[reading] = code
+        return sensor, code
+
+
+    def decode(self, sensor: int, reading: int) -> tuple:
+        """Return the (sensor type, reading label) pair of codes"""
+        return self.sensor_names[sensor], self.reading_labels[sensor][reading]
+
 
-    def add_observation(self, row: int, col: int, sensor_type: str, reading: str):
+    def add_observation(self, row: int, col: int, sensor_type: str, reading: str, step: int = None):
         """Add a observation"""
-        key = (row, col)
-        
-        if key not in self.observations:
-            self.observations[key] = {}
-            
-        self.observations[key][sensor_type] = reading
-        
+        sensor, code = self.encode(sensor_type, reading)
+
+        if self.length == len(self.data['row']):
+            for name, column in self.data.items():
+                grown = np.zeros(2 * len(column), dtype=column.dtype)
+                grown[:self.length] = column[:self.length]
+                PROFILER.allocated("Observations.grow", grown)
+                self.data[name] = grown
+
+        index = self.length
+        self.data['row'][index] = row
+        self.data['col'][index] = col
+        self.data['sensor'][index] = sensor
+        self.data['reading'][index] = code
+        self.data['step'][index] = index if step is None else step
+        self.length += 1
+
+        self.latest[(row, col, sensor)] = index
+
 
     def get_observation(self, row: int, col: int, sensor_type: str) -> Optional[str]:
         """Get a observarion"""
-        key = (row, col)
-        if key in self.observations:
-            return self.observations[key].get(sensor_type)
-        return None
-    
+        sensor = self.sensor_codes.get(sensor_type)
+        index = self.latest.get((row, col, sensor))
+        if index is None:
+            return None
+        return self.reading_labels[sensor][self.data['reading'][index]]
+
+    def key(self, index: int) -> tuple:
+        """Return the (row, col, sensor code) of an entry of the log"""
+        return (int(self.data['row'][index]), int(self.data['col'][index]), int(self.data['sensor'][index]))
+
     def get_all_observations(self) -> Dict:
-        """Return observations"""
-        return self.observations.copy()
-    
+        """Return the latest observations as {(row, col): {sensor_type: reading}}"""
+        observations = {}
+        for (row, col, sensor), index in self.latest.items():
+            sensor_type, reading = self.decode(sensor, self.data['reading'][index])
+            observations.setdefault((row, col), {})[sensor_type] = reading
+        return observations
+
+
+    def snapshot(self) -> int:
+        """Return a snapshot of the log: its current length"""
+        return self.length
+
+
+    def columns(self, length: int = None, latest_only: bool = False) -> Dict[str, np.ndarray]:
+        """
+        Return the log up to `length` as read-only column views. With
+        latest_only, keep only the latest reading of each (row, col, sensor)
+        """
+        length = self.length if length is None else length
+        view = {}
+        for name, column in self.data.items():
+            view[name] = column[:length]
+            view[name].flags.writeable = False
+
+        if latest_only:
+            mask = self.latest_mask(length)
+            view = {name: column[mask] for name, column in view.items()}
+        return view
+
+
+    def latest_mask(self, length: int = None) -> np.ndarray:
+        """Return a mask of the entries that are the latest of their (row, col, sensor)"""
+        length = self.length if length is None else length
+        keys = self._keys(length)
+        # np.unique keeps the first occurrence, so look at the log backwards
+        _, first = np.unique(keys[::-1], return_index=True)
+        mask = np.zeros(length, dtype=bool)
+        mask[length - 1 - first] = True
+        return mask
+
+
+    def counts(self, length: int = None, latest_only: bool = False) -> Dict[str, np.ndarray]:
+        """
+        Return the distinct (row, col, sensor, reading) entries of the log with
+        the number of times each was read
+        """
+        view = self.columns(length, latest_only)
+        keys = (self._keys_of(view) << 8) | view['reading'].astype(np.int64)
+        _, first, counts = np.unique(keys, return_index=True, return_counts=True)
+
+        unique = {name: view[name][first] for name in ('row', 'col', 'sensor', 'reading')}
+        unique['count'] = counts
+        return unique
+
+
+    def _keys(self, length: int) -> np.ndarray:
+        return self._keys_of({name: column[:length] for name, column in self.data.items()})
+
+
+    @staticmethod
+    def _keys_of(view: Dict[str, np.ndarray]) -> np.ndarray:
+        return ((view['row'].astype(np.int64) << 36) |
+                (view['col'].astype(np.int64) << 8) |
+                view['sensor'].astype(np.int64))
+
+
+    def __len__(self):
+        return self.length
+
     def clear(self):
         """Clear observations"""
-        self.observations.clear()
\ No newline at end of file
+        self.length = 0
+        self.latest.clear()
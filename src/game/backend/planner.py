@@ -0,0 +1,140 @@
+import time
+import numpy as np
+from collections import OrderedDict
+
+
+class _Timeout(Exception):
+    pass
+
+
+class SurveyPlanner:
+    """
+    Depth-limited expectimax over survey sequences. The value of a belief is
+    the best of excavating now, worth max P(A) * budget as in GameLogic.excavate,
+    and the expected value of each candidate survey over its possible readings.
+
+    Beliefs are keyed by their observation set, so different orderings of the
+    same readings share one entry of an LRU transposition table
+    """
+    def __init__(self, game, depth: int = 2, candidates: int = 6, table_size: int = 4096):
+        self.game = game
+        self.depth = depth
+        self.candidates = candidates
+        self.table_size = table_size
+        self.table = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.deadline = None
+
+
+    def plan(self, depth: int = None, time_budget: float = None) -> dict:
+        """
+        Return the expected-score-maximizing action. Searches one level deeper
+        per iteration until `depth` or `time_budget` seconds, keeping the answer
+        of the deepest search that completed
+        """
+        depth = self.depth if depth is None else depth
+        self.deadline = None if time_budget is None else time.perf_counter() + time_budget
+
+        observations = frozenset(self._current_observations().items())
+        posterior = np.array(self.game.grid.probabilities)
+        budget = self.game.budget
+
+        value, action = self._excavation(posterior, budget)
+        completed = 0
+        for level in range(1, depth + 1):
+            try:
+                value, action = self._search(observations, posterior, budget, level)
+            except _Timeout:
+                break
+            completed = level
+
+        plan = dict(action)
+        plan['value'] = float(value)
+        plan['depth'] = completed
+        return plan
+
+
+    def clear(self):
+        """
+        Empty the transposition table
+        """
+        self.table.clear()
+
+
+    def _current_observations(self) -> dict:
+        observations = {}
+        for (row, col), sensor_readings in self.game.observations.get_all_observations().items():
+            for sensor_type, reading in sensor_readings.items():
+                observations[((row, col), sensor_type)] = reading
+        return observations
+
+
+    def _excavation(self, posterior: np.ndarray, budget: int) -> tuple:
+        row, col = np.unravel_index(np.argmax(posterior), posterior.shape)
+        action = {'action': 'excavate', 'row': int(row), 'col': int(col)}
+        return posterior[row, col] * budget, action
+
+
+    def _search(self, observations: frozenset, posterior: np.ndarray, budget: int, depth: int) -> tuple:
+        key = (observations, budget, depth)
+        entry = self.table.get(key)
+        if entry is not None:
+            self.table.move_to_end(key)
+            self.hits += 1
+            return entry
+        self.misses += 1
+
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise _Timeout()
+
+        best = self._excavation(posterior, budget)
+        if depth > 0:
+            known = dict(observations)
+            for candidate in self.game.advisor.rank(posterior, True, budget, self.candidates):
+                value = self._survey_value(known, posterior, budget, depth, candidate)
+                if value > best[0]:
+                    best = (value, {'action': 'survey', 'row': candidate['row'],
+                                    'col': candidate['col'], 'sensor': candidate['sensor']})
+
+        self.table[key] = best
+        if len(self.table) > self.table_size:
+            self.table.popitem(last=False)
+        return best
+
+
+    def _survey_value(self, known: dict, posterior: np.ndarray, budget: int, depth: int, candidate: dict) -> float:
+        """
+        Expected value of a survey, summed over its readings. A reading replaces
+        the previous one of the same cell and sensor, whose likelihood is divided out
+        """
+        row, col, sensor_type = candidate['row'], candidate['col'], candidate['sensor']
+        bayesian = self.game.bayesian
+        sensor = self.game.grid.sensors[sensor_type]
+
+        previous = known.get(((row, col), sensor_type))
+        base = posterior
+        if previous is not None:
+            old_likelihood = bayesian.likelihood(row, col, sensor_type, previous)
+            if not np.all(old_likelihood > 0):
+                return -np.inf
+            base = posterior / old_likelihood
+
+        value = 0.0
+        for reading in sensor.labels:
+            likelihood = bayesian.likelihood(row, col, sensor_type, reading)
+            p_reading = np.sum(posterior * likelihood)
+            if p_reading <= 0:
+                continue
+            child = base * likelihood
+            child /= np.sum(child)
+
+            known[((row, col), sensor_type)] = reading
+            child_value, _ = self._search(frozenset(known.items()), child, budget - candidate['cost'], depth - 1)
+            value += p_reading * child_value
+
+        if previous is None:
+            del known[((row, col), sensor_type)]
+        else:
+            known[((row, col), sensor_type)] = previous
+        return value
@@ -0,0 +1,119 @@
+import numpy as np
+from backend.gamelogic import GameLogic
+from backend.streams import GameStreams
+
+
+def survey(row: int, col: int, sensor_type: str) -> tuple:
+    return ('survey', row, col, sensor_type)
+
+
+def excavate(row: int, col: int) -> tuple:
+    return ('excavate', row, col)
+
+
+def observe(game: GameLogic) -> dict:
+    """
+    Return what a policy sees of a game: the posterior (read-only), the
+    budget, sensor costs, current readings and the game's advisor and planner
+    """
+    posterior = game.grid.probabilities.view()
+    posterior.flags.writeable = False
+    return {
+        'posterior': posterior,
+        'budget': game.budget,
+        'costs': {name: sensor.get_cost() for name, sensor in game.grid.sensors.items()},
+        'readings': game.observations.get_all_observations(),
+        'survey_count': game.survey_count,
+        'recommend': game.recommend_survey,
+        'plan': game.plan_action,
+    }
+
+
+def best_cell(posterior: np.ndarray) -> tuple:
+    row, col = np.unravel_index(np.argmax(posterior), posterior.shape)
+    return int(row), int(col)
+
+
+class Policy:
+    """
+    A strategy: act() gets observe(game) and returns survey(...) or excavate(...)
+    """
+    name = "policy"
+
+    def reset(self, seed: int):
+        """Called before every game"""
+        pass
+
+    def act(self, observation: dict) -> tuple:
+        raise NotImplementedError
+
+
+class ExcavateNow(Policy):
+    """
+    Excavate the most likely cell without surveying
+    """
+    name = "excavate"
+
+    def act(self, observation):
+        return excavate(*best_cell(observation['posterior']))
+
+
+class RandomSurvey(Policy):
+    """
+    Survey random cells with random affordable sensors, then excavate the most
+    likely cell
+    """
+    name = "random"
+
+    def __init__(self, surveys: int = 10):
+        self.surveys = surveys
+        self.rng = np.random.default_rng()
+
+    def reset(self, seed):
+        self.rng = GameStreams(seed).policy()
+
+    def act(self, observation):
+        affordable = [s for s, cost in observation['costs'].items() if cost <= observation['budget']]
+        if observation['survey_count'] >= self.surveys or not affordable:
+            return excavate(*best_cell(observation['posterior']))
+        rows, cols = observation['posterior'].shape
+        return survey(int(self.rng.integers(rows)), int(self.rng.integers(cols)),
+                      affordable[self.rng.integers(len(affordable))])
+
+
+class GreedyInformation(Policy):
+    """
+    Take the survey with the highest expected information gain per cost until
+    a cell reaches `confidence` or the budget runs out
+    """
+    name = "greedy"
+
+    def __init__(self, confidence: float = 0.5):
+        self.confidence = confidence
+
+    def act(self, observation):
+        posterior = observation['posterior']
+        if posterior.max() < self.confidence:
+            ranked = observation['recommend'](True, 1)
+            if ranked and ranked[0]['gain'] > 0:
+                return survey(ranked[0]['row'], ranked[0]['col'], ranked[0]['sensor'])
+        return excavate(*best_cell(posterior))
+
+
+class Expectimax(Policy):
+    """
+    Follow the expected-score-maximizing action of the survey planner
+    """
+    name = "planner"
+
+    def __init__(self, depth: int = 1):
+        self.depth = depth
+
+    def act(self, observation):
+        plan = observation['plan'](self.depth)
+        if plan.get('action') == 'survey':
+            return survey(plan['row'], plan['col'], plan['sensor'])
+        return excavate(*best_cell(observation['posterior']))
+
+
+POLICIES = {policy.name: policy for policy in (ExcavateNow, RandomSurvey, GreedyInformation, Expectimax)}
@@ -1,10 +1,17 @@
+NOT_USED = "Not Used"
+
+
 class Position:
-    def __init__(self, x, y):
+    """
+    Lightweight view of a grid cell. The cell state lives in the arrays of the
+    grid it is attached to; a detached position only carries coordinates
+    """
+    __slots__ = ("x", "y", "grid")
+
+    def __init__(self, x, y, grid=None):
         self.x = int(x)
         self.y = int(y)
-        self.p = None
-        self.p0= None
-        self.status = {'GPR': "Not Used",'MAG': "Not Used",'VIS': "Not Used"}
+        self.grid = grid
 
     def manhattan_distance(self, other):
         """
@@ -13,6 +20,27 @@ class Position:
         return abs(self.x - other.x) + abs(self.y - other.y)
 
 
+    @property
+    def p(self):
+        if self.grid is None:
+            return None
+        return float(self.grid.probabilities[self.x, self.y])
+
+
+    @property
+    def p0(self):
+        if self.grid is None:
+            return None
+        return float(self.grid.priors[self.x, self.y])
+
+
+    @property
+    def status(self):
+        if self.grid is None:
+            return {'GPR': NOT_USED, 'MAG': NOT_USED, 'VIS': NOT_USED}
+        return self.grid.get_status(self.x, self.y)
+
+
     def set_initial_state(self, p):
         """
         Set initial state probability
@@ -20,28 +48,64 @@ class Position:
         if (p > 1.0 or p < 0.0):
             raise ValueError("Probability out of the boundaries")
         else:
-            self.p0 = p
-            self.p = p
+            self._attached().priors[self.x, self.y] = p
+            self.grid.probabilities[self.x, self.y] = p
 
 
-    def set_probability(self, p):    
+    def set_probability(self, p):
         """
         Set probability
         """
         if (p > 1.0 or p < 0.0):
             raise ValueError("Probability out of the boundaries")
         else:
-            self.p = p
+            self._attached().probabilities[self.x, self.y] = p
 
     def set_status(self, sensor, status):
         """
-        Set the sensor status        
+        Set the sensor status
         """
-        self.status[sensor] = status
+        self._attached().set_reading(self.x, self.y, sensor, status)
+
 
-    
     def get_probability(self):
         """
         Return probability
         """
         return self.p
+
+
+    def _attached(self):
+        if self.grid is None:
+            raise ValueError("Position is not attached to a grid")
+        return self.grid
+
+
+class PositionGrid:
+    """
+    2D index of Position views over a grid, created lazily on first access
+    """
+    def __init__(self, grid):
+        self.grid = grid
+        self.views = {}
+
+
+    @property
+    def shape(self):
+        return (self.grid.rows, self.grid.columns)
+
+
+    def __getitem__(self, key) -> Position:
+        row, col = key
+        if row < 0:
+            row += self.grid.rows
+        if col < 0:
+            col += self.grid.columns
+        if not (0 <= row < self.grid.rows and 0 <= col < self.grid.columns):
+            raise IndexError(f"Position ({row},{col}) out of the grid")
+
+        view = self.views.get((row, col))
+        if view is None:
+            view = Position(row, col, self.grid)
+            self.views[(row, col)] = view
+        return view
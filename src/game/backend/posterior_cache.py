@@ -0,0 +1,161 @@
+import numpy as np
+from collections import OrderedDict
+from backend.profiling import PROFILER
+
+TERM_BYTES = 128  # rough size of one observation term in a cached key
+
+
+class PosteriorCache:
+    """
+    LRU cache of posteriors in front of BayesianInference.compute_posterior.
+
+    An observation set is a frozenset of (row, col, sensor, reading, count)
+    terms. Its key XORs the hashes of the terms with the sensor config version,
+    so it doesn't depend on the order of the readings, and the key of the set
+    with one reading less is one XOR away: a miss whose parent set is cached
+    only multiplies in the missing likelihood. Entries are evicted, least
+    recently used first, once they hold more than `max_bytes`
+    """
+    def __init__(self, bayesian, max_bytes: int = 32 << 20):
+        self.bayesian = bayesian
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (terms, belief, nbytes)
+        self.nbytes = 0
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.extended = 0
+        self.evicted = 0
+
+
+    def posterior(self, observations, repeats: bool = False) -> np.ndarray:
+        """
+        Return P(A | readings) like compute_posterior, reusing cached beliefs
+        """
+        # The version the likelihood tables in use came from, not the one on disk now
+        version = self.bayesian.grid.config_version
+        if version != self.version:
+            # Posteriors of another sensor config can't be hit again
+            self.clear()
+            self.version = version
+
+        terms = self.terms(observations, repeats)
+        key = hash(version)
+        for term in terms:
+            key ^= hash(term)
+
+        belief = self._lookup(key, terms)
+        if belief is not None:
+            self.hits += 1
+            PROFILER.count("posterior_cache.hit")
+        else:
+            self.misses += 1
+            PROFILER.count("posterior_cache.miss")
+            belief = self._extend(key, terms)
+            if belief is None:
+                belief = self._build(terms)
+            self._store(key, terms, belief)
+
+        return np.array(belief.posterior())
+
+
+    @staticmethod
+    def terms(observations, repeats: bool = False) -> frozenset:
+        """
+        Return the canonical observation set of a log: its distinct readings
+        with their counts. By default only the latest reading of each
+        (cell, sensor) counts, once
+        """
+        entries = observations.counts(latest_only=not repeats)
+        terms = []
+        for row, col, sensor, code, count in zip(entries['row'], entries['col'], entries['sensor'],
+                                                 entries['reading'], entries['count']):
+            sensor_type, reading = observations.decode(sensor, code)
+            terms.append((int(row), int(col), sensor_type, reading, int(count)))
+        return frozenset(terms)
+
+
+    def stats(self) -> dict:
+        return {
+            'entries': len(self.entries),
+            'bytes': self.nbytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'extended': self.extended,
+            'evicted': self.evicted,
+        }
+
+
+    def clear(self):
+        """
+        Drop every cached posterior
+        """
+        self.entries.clear()
+        self.nbytes = 0
+
+
+    def _lookup(self, key: int, terms: frozenset):
+        entry = self.entries.get(key)
+        # Equal keys of different sets are possible, if unlikely
+        if entry is None or entry[0] != terms:
+            return None
+        self.entries.move_to_end(key)
+        return entry[1]
+
+
+    def _extend(self, key: int, terms: frozenset):
+        """
+        Build the belief of `terms` from a cached parent lacking one of its readings
+        """
+        for term in terms:
+            row, col, sensor_type, reading, count = term
+            parent_term = (row, col, sensor_type, reading, count - 1) if count > 1 else None
+            parent_key = key ^ hash(term)
+            if parent_term is not None:
+                parent_key ^= hash(parent_term)
+            # Only build the parent set, O(terms), when its key is cached
+            if parent_key not in self.entries:
+                continue
+
+            parent_terms = terms - {term}
+            if parent_term is not None:
+                parent_terms = parent_terms | {parent_term}
+            parent = self._lookup(parent_key, parent_terms)
+            if parent is None:
+                continue
+            self.extended += 1
+            PROFILER.count("posterior_cache.extend")
+            belief = parent.copy()
+            belief.multiply(self.bayesian._get_likelihood_table(sensor_type, reading),
+                            self.bayesian._compute_distances(row, col))
+            belief.normalize()
+            return belief
+        return None
+
+
+    def _build(self, terms: frozenset):
+        """
+        Build the belief of `terms` from the prior
+        """
+        belief = self.bayesian.new_belief()
+        for row, col, sensor_type, reading, count in sorted(terms):
+            belief.multiply(self.bayesian._get_likelihood_table(sensor_type, reading),
+                            self.bayesian._compute_distances(row, col), count)
+        belief.normalize()
+        return belief
+
+
+    def _store(self, key: int, terms: frozenset, belief):
+        nbytes = belief.values.nbytes + TERM_BYTES * len(terms)
+        if nbytes > self.max_bytes:
+            return
+        previous = self.entries.pop(key, None)
+        if previous is not None:
+            self.nbytes -= previous[2]
+
+        self.entries[key] = (terms, belief, nbytes)
+        self.nbytes += nbytes
+        while self.nbytes > self.max_bytes:
+            _, (_, _, evicted_bytes) = self.entries.popitem(last=False)
+            self.nbytes -= evicted_bytes
+            self.evicted += 1
@@ -0,0 +1,165 @@
+import numpy as np
+from backend.grid import Grid
+
+RING_OFFSETS_LIMIT = 64
+
+
+def xlogx(x: np.ndarray) -> np.ndarray:
+    """
+    x * log(x) with 0 * log(0) = 0
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(x > 0, x * np.log(x), 0.0)
+
+
+KERNELS = {
+    "likelihood": lambda table: table,
+    "entropy": xlogx,
+}
+
+
+def ring_offsets(radius: int) -> list:
+    """
+    Return the (di, dj) offsets at Manhattan distance `radius`
+    """
+    if radius == 0:
+        return [(0, 0)]
+    offsets = []
+    for di in range(-radius, radius + 1):
+        dj = radius - abs(di)
+        offsets.append((di, dj))
+        if dj != 0:
+            offsets.append((di, -dj))
+    return offsets
+
+
+def ring_sums(values: np.ndarray, radius: int) -> np.ndarray:
+    """
+    Return sums[k, i, j] = sum of values over the cells at Manhattan distance k
+    from (i, j), for k < radius. Cells off the board count as zero
+    """
+    rows, cols = values.shape
+    padded = np.zeros((rows + 2 * radius, cols + 2 * radius))
+    padded[radius:radius + rows, radius:radius + cols] = values
+
+    sums = np.zeros((radius, rows, cols))
+    for k in range(radius):
+        for di, dj in ring_offsets(k):
+            sums[k] += padded[radius + di:radius + di + rows, radius + dj:radius + dj + cols]
+    return sums
+
+
+class PredictiveMaps:
+    """
+    Board-wide Manhattan convolutions with sensor CPT kernels:
+    out[r, c] = sum_a values(a) * W[min(d(a, c), D), r], for every cell c at once.
+    With values = posterior and W = CPT this is P(reading r | survey at c).
+
+    W is constant past D, so out = W[D] * sum(values) + the near-field part.
+    Short CPTs sum the near field over Manhattan rings; long ones use FFT
+    convolution with the kernel spectra cached per (FFT shape, sensor, kernel)
+    """
+    def __init__(self, grid: Grid, method: str = "auto"):
+        if method not in ("auto", "ring", "fft"):
+            raise ValueError(f"Unknown convolution method: {method}")
+        self.grid = grid
+        self.method = method
+        self.kernel_cache = {}
+
+
+    def reading_maps(self, posterior: np.ndarray, sensor_type: str) -> np.ndarray:
+        """
+        Return [n_readings, rows, cols] predictive reading probabilities of a sensor
+        """
+        return np.maximum(self.convolve(posterior, sensor_type), 0.0)
+
+
+    def convolve(self, values: np.ndarray, sensor_type: str, kernel: str = "likelihood") -> np.ndarray:
+        """
+        Return out[r, i, j] = sum_a values(a) * W[min(d(a, (i, j)), D), r],
+        where W is KERNELS[kernel] applied to the sensor's CPT table
+        """
+        sensor = self.grid.sensors[sensor_type]
+        weights = KERNELS[kernel](sensor.table)
+        depth = sensor.max_distance
+        far = weights[depth][:, None, None] * np.sum(values)
+        if depth == 0:
+            return np.broadcast_to(far, (len(weights[depth]),) + values.shape).copy()
+
+        if self.use_rings(depth):
+            near = weights[:depth] - weights[depth]
+            return far + np.einsum('kr,kij->rij', near, ring_sums(values, depth))
+
+        return far + self._fft_near_field(values, sensor_type, kernel, weights)
+
+
+    def use_rings(self, depth: int) -> bool:
+        """
+        Ring sums cost one shifted add per offset closer than `depth`
+        """
+        if self.method != "auto":
+            return self.method == "ring"
+        return 2 * depth * (depth - 1) + 1 <= RING_OFFSETS_LIMIT
+
+
+    def _fft_near_field(self, values, sensor_type, kernel, weights) -> np.ndarray:
+        rows, cols = values.shape
+        # Offsets span 2n-1 values, so a period that long avoids wrap-around
+        shape = (fast_length(2 * rows - 1), fast_length(2 * cols - 1))
+        spectrum = self._kernel_spectrum(sensor_type, kernel, weights, shape)
+
+        transformed = np.fft.rfft2(values, s=shape)
+        full = np.fft.irfft2(spectrum * transformed[None], s=shape)
+        return full[:, :rows, :cols]
+
+
+    def _kernel_spectrum(self, sensor_type, kernel, weights, shape) -> np.ndarray:
+        """
+        Return the cached rfft2 of the near-field kernel (W - W[D]), laid out
+        circularly over a period of `shape`
+        """
+        key = (shape, sensor_type, kernel)
+        table = self.grid.sensors[sensor_type].table
+        cached = self.kernel_cache.get(key)
+        if cached is not None and cached[0] is table:
+            return cached[1]
+
+        depth = self.grid.sensors[sensor_type].max_distance
+        di = circular_distance(shape[0], self.grid.rows)[:, None]
+        dj = circular_distance(shape[1], self.grid.columns)[None, :]
+        near = np.vstack([weights - weights[depth], np.zeros((1, weights.shape[1]))])
+        # Offsets beyond the board map to the zero row
+        distance = np.where((di < 0) | (dj < 0), len(near) - 1, np.minimum(di + dj, depth))
+        kernels = np.moveaxis(near[distance], -1, 0)
+
+        spectrum = np.fft.rfft2(kernels, s=shape)
+        self.kernel_cache[key] = (table, spectrum)
+        return spectrum
+
+
+def fast_length(n: int) -> int:
+    """
+    Return the smallest 2^a 3^b 5^c >= n, a fast FFT length
+    """
+    best = 1 << max(n - 1, 0).bit_length()
+    p5 = 1
+    while p5 < best:
+        p35 = p5
+        while p35 < best:
+            length = p35
+            while length < n:
+                length *= 2
+            best = min(best, length)
+            p35 *= 3
+        p5 *= 5
+    return best
+
+
+def circular_distance(period: int, size: int) -> np.ndarray:
+    """
+    Return |offset| of every index of a circular axis holding offsets in
+    [-(size-1), size-1], or -1 where the index holds no offset
+    """
+    index = np.arange(period)
+    offset = np.where(index < size, index, index - period)
+    return np.where(np.abs(offset) < size, np.abs(offset), -1)
@@ -0,0 +1,199 @@
+import os
+import json
+import time
+import atexit
+import threading
+import functools
+
+ENV_VAR = "LOSTARK_PROFILE"
+MAX_EVENTS = 1_000_000
+
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NO_SPAN = _NoSpan()
+
+
+class _Span:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, self.start, time.perf_counter_ns() - self.start)
+        return False
+
+
+class Profiler:
+    """
+    Timing spans, call counters and allocated byte counts of the hot paths.
+    When disabled every hook is a flag check, so instrumented code pays next
+    to nothing. Spans are kept as events for a Chrome trace (chrome://tracing,
+    Perfetto) and aggregated per name for summary()
+    """
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.origin = time.perf_counter_ns()
+        self.events = []
+        self.dropped = 0
+        self.spans = {}     # name -> [calls, total ns, max ns]
+        self.counters = {}  # name -> count
+        self.allocations = {}  # name -> bytes
+
+
+    def enable(self):
+        self.enabled = True
+
+
+    def disable(self):
+        self.enabled = False
+
+
+    def reset(self):
+        """
+        Forget everything recorded so far
+        """
+        self.origin = time.perf_counter_ns()
+        self.events = []
+        self.dropped = 0
+        self.spans = {}
+        self.counters = {}
+        self.allocations = {}
+
+
+    def span(self, name: str):
+        """
+        Context manager timing a block
+        """
+        if not self.enabled:
+            return NO_SPAN
+        return _Span(self, name)
+
+
+    def record(self, name: str, start_ns: int, duration_ns: int):
+        stats = self.spans.get(name)
+        if stats is None:
+            stats = self.spans[name] = [0, 0, 0]
+        stats[0] += 1
+        stats[1] += duration_ns
+        stats[2] = max(stats[2], duration_ns)
+
+        if len(self.events) < MAX_EVENTS:
+            self.events.append((name, start_ns, duration_ns, threading.get_ident()))
+        else:
+            self.dropped += 1
+
+
+    def count(self, name: str, n: int = 1):
+        """
+        Add n to a counter
+        """
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+
+    def allocated(self, name: str, array):
+        """
+        Account for a new array (or a byte count) allocated by `name`
+        """
+        if self.enabled:
+            nbytes = getattr(array, 'nbytes', array)
+            self.allocations[name] = self.allocations.get(name, 0) + int(nbytes)
+
+
+    def summary(self) -> dict:
+        """
+        Return calls/total/mean/max milliseconds per span, counters and allocated bytes
+        """
+        spans = {
+            name: {
+                'calls': calls,
+                'total_ms': total / 1e6,
+                'mean_ms': total / calls / 1e6,
+                'max_ms': peak / 1e6,
+            }
+            for name, (calls, total, peak) in sorted(self.spans.items())
+        }
+        return {
+            'spans': spans,
+            'counters': dict(sorted(self.counters.items())),
+            'allocated_bytes': dict(sorted(self.allocations.items())),
+            'dropped_events': self.dropped,
+        }
+
+
+    def chrome_trace(self) -> dict:
+        """
+        Return the spans as Chrome trace complete events, with the summary attached
+        """
+        pid = os.getpid()
+        events = [
+            {
+                'name': name,
+                'ph': 'X',
+                'ts': (start - self.origin) / 1e3,
+                'dur': duration / 1e3,
+                'pid': pid,
+                'tid': tid,
+            }
+            for name, start, duration, tid in self.events
+        ]
+        return {'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': self.summary()}
+
+
+    def dump(self, path, trace: bool = True):
+        """
+        Write the Chrome trace (or only the summary) as JSON
+        """
+        data = self.chrome_trace() if trace else self.summary()
+        with open(path, 'w') as f:
+            json.dump(data, f)
+
+
+PROFILER = Profiler()
+
+
+def profiled(name: str):
+    """
+    Decorator timing every call of a function as span `name`
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not PROFILER.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                PROFILER.record(name, start, time.perf_counter_ns() - start)
+        return wrapper
+    return decorator
+
+
+def _enable_from_environment():
+    """
+    LOSTARK_PROFILE=1 enables profiling; any other value that isn't 0 is also
+    the path the Chrome trace is written to at exit
+    """
+    value = os.environ.get(ENV_VAR, "")
+    if value in ("", "0"):
+        return
+    PROFILER.enable()
+    if value != "1":
+        atexit.register(PROFILER.dump, value)
+
+
+_enable_from_environment()
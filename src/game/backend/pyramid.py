@@ -0,0 +1,116 @@
+import numpy as np
+
+
+def pool(values: np.ndarray, ufunc) -> np.ndarray:
+    """
+    Pool 2x2 blocks of a non-negative map with np.add or np.maximum.
+    Odd edges are padded with zeros
+    """
+    rows, cols = values.shape
+    padded = np.zeros((rows + rows % 2, cols + cols % 2))
+    padded[:rows, :cols] = values
+    blocks = padded.reshape(padded.shape[0] // 2, 2, padded.shape[1] // 2, 2)
+    return ufunc.reduce(ufunc.reduce(blocks, axis=3), axis=1)
+
+
+class ProbabilityPyramid:
+    """
+    Mipmap of a probability map: level k pools 2^k x 2^k blocks of cells into
+    their sum (probability mass) and their max (peak), down to a single cell.
+
+    Values are stored divided by a lazy global scale. A survey only changes the
+    likelihood near the surveyed cell and renormalization multiplies every other
+    cell by one factor, so update() folds that factor into the scale and re-pools
+    only the blocks over the changed box
+    """
+    def __init__(self, values: np.ndarray):
+        self.shape = values.shape
+        self.scale = 1.0
+        self.sums = []
+        self.maxes = []
+        self.rebuild(values)
+
+
+    def rebuild(self, values: np.ndarray):
+        """
+        Recompute every level from values
+        """
+        base = np.array(values, dtype=np.float64)
+        self.shape = base.shape
+        self.scale = 1.0
+        self.sums = [base]
+        self.maxes = [base]
+        while self.sums[-1].shape != (1, 1):
+            self.sums.append(pool(self.sums[-1], np.add))
+            self.maxes.append(pool(self.maxes[-1], np.maximum))
+
+
+    def update(self, values: np.ndarray, box: tuple = None):
+        """
+        Bring the pyramid up to date with values, which differ from the stored
+        map by a constant factor outside box = (row0, row1, col0, col1), half-open.
+        Without a box everything is rebuilt
+        """
+        if box is None or values.shape != self.shape:
+            return self.rebuild(values)
+
+        base = self.sums[0]
+        reference = self._reference(box)
+        if reference is None:
+            return self.rebuild(values)
+        scale = values[reference] / base[reference]
+        if not (np.isfinite(scale) and scale > 0):
+            return self.rebuild(values)
+        self.scale = scale
+
+        row0, row1, col0, col1 = box
+        if row0 >= row1 or col0 >= col1:
+            return
+        base[row0:row1, col0:col1] = values[row0:row1, col0:col1] / scale
+
+        for level in range(1, len(self.sums)):
+            row0, row1 = row0 // 2, (row1 + 1) // 2
+            col0, col1 = col0 // 2, (col1 + 1) // 2
+            for levels, ufunc in ((self.sums, np.add), (self.maxes, np.maximum)):
+                source = levels[level - 1][2 * row0:2 * row1, 2 * col0:2 * col1]
+                levels[level][row0:row1, col0:col1] = pool(source, ufunc)
+
+
+    def _reference(self, box: tuple):
+        """
+        Return the board corner outside box with the largest stored value, None
+        if there is no usable one
+        """
+        row0, row1, col0, col1 = box
+        base = self.sums[0]
+        rows, cols = self.shape
+        best = None
+        for corner in ((0, 0), (0, cols - 1), (rows - 1, 0), (rows - 1, cols - 1)):
+            if row0 <= corner[0] < row1 and col0 <= corner[1] < col1:
+                continue
+            if base[corner] > np.finfo(np.float64).tiny and (best is None or base[corner] > base[best]):
+                best = corner
+        return best
+
+
+    def level_for(self, pixels_per_cell: float) -> int:
+        """
+        Return the finest level whose pooled cells span at least one pixel
+        """
+        if pixels_per_cell >= 1:
+            return 0
+        level = int(np.ceil(-np.log2(pixels_per_cell)))
+        return min(level, len(self.sums) - 1)
+
+
+    def level_shape(self, level: int) -> tuple:
+        return self.sums[level].shape
+
+
+    def window(self, level: int, row0: int, row1: int, col0: int, col1: int) -> tuple:
+        """
+        Return the (sums, maxes) of a level's pooled cells in [row0, row1) x [col0, col1)
+        """
+        sums = self.sums[level][row0:row1, col0:col1] * self.scale
+        maxes = self.maxes[level][row0:row1, col0:col1] * self.scale
+        return sums, maxes
@@ -0,0 +1,171 @@
+import json
+import struct
+import zipfile
+import numpy as np
+from backend.config import load_config
+from backend.gamelogic import GameLogic
+
+FORMAT_VERSION = 1
+ARRAYS = ("probabilities", "priors", "readings", "belief")
+ALIGNMENT = 64
+PADDING_ID = 0x6c61  # zip extra field holding the alignment padding
+
+
+def save_game(game: GameLogic, path):
+    """
+    Write a game to an uncompressed .npz: the board arrays, the running belief,
+    the observation log, the sensor streams' remaining uniforms and a JSON
+    header with the scalars and bit-generator states
+    """
+    grid = game.grid
+    observations = game.observations
+    length = len(observations)
+
+    streams = {}
+    arrays = {}
+    for sensor_type, sensor in grid.sensors.items():
+        stream = sensor.rng
+        streams[sensor_type] = stream.generator.bit_generator.state
+        arrays[f"stream_{sensor_type}"] = stream.buffer[stream.index:]
+
+    meta = {
+        'format': FORMAT_VERSION,
+        'rows': grid.rows,
+        'columns': grid.columns,
+        'seed': int(grid.streams.seed),
+        'artifact': [grid.A.x, grid.A.y],
+        'artifact_stream': grid.rng.bit_generator.state,
+        'sensor_streams': streams,
+        'config_path': None if grid.config_path is None else str(grid.config_path),
+        'config_version': grid.config_version,
+        'engine': game.bayesian.engine,
+        'dtype': game.bayesian.dtype.str,
+        'budget': game.budget,
+        'score': game.score,
+        'game_over': game.game_over,
+        'hypothetical': game.hypothetical,
+        'survey_count': game.survey_count,
+        'game_id': game.game_id,
+        'survey_history': game.survey_history,
+        'sensor_names': observations.sensor_names,
+        'reading_labels': observations.reading_labels,
+    }
+
+    arrays.update({
+        'meta': np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8),
+        'probabilities': grid.probabilities,
+        'priors': grid.priors,
+        'readings': grid.readings,
+        'belief': game.bayesian.belief.values,
+    })
+    for name, column in observations.columns().items():
+        arrays[f"log_{name}"] = column[:length]
+
+    write_npz(path, arrays)
+
+
+def load_game(path, mmap: bool = False, event_log=None) -> GameLogic:
+    """
+    Restore a game saved by save_game. It continues bit-identically to the
+    original. With mmap, the board arrays and the belief are copy-on-write
+    memory maps of the file instead of being read into memory
+    """
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(data['meta'].tobytes().decode())
+        if meta['format'] != FORMAT_VERSION:
+            raise ValueError(f"Unknown snapshot format: {meta['format']}")
+        small = {name: data[name] for name in data.files if name not in ARRAYS}
+        arrays = memory_map(path, ARRAYS) if mmap else {name: data[name] for name in ARRAYS}
+
+    config_path = meta['config_path']
+    if load_config(config_path).version != meta['config_version']:
+        raise ValueError("The snapshot was saved with a different sensor configuration")
+
+    game = GameLogic(meta['rows'], meta['columns'], meta['seed'], meta['budget'],
+                     meta['engine'], np.dtype(meta['dtype']), config_path,
+                     event_log, meta['game_id'])
+    grid = game.grid
+
+    grid.A.x, grid.A.y = meta['artifact']
+    grid.rng.bit_generator.state = meta['artifact_stream']
+    for sensor_type, state in meta['sensor_streams'].items():
+        stream = grid.sensors[sensor_type].rng
+        stream.generator.bit_generator.state = state
+        stream.buffer = np.array(small[f"stream_{sensor_type}"])
+        stream.index = 0
+
+    grid.probabilities = arrays['probabilities']
+    grid.priors = arrays['priors']
+    grid.readings = arrays['readings']
+    game.bayesian.prior = grid.priors
+    game.bayesian.belief.values = arrays['belief']
+
+    observations = game.observations
+    observations.sensor_names = meta['sensor_names']
+    observations.sensor_codes = {name: k for k, name in enumerate(observations.sensor_names)}
+    observations.reading_labels = meta['reading_labels']
+    observations.reading_codes = [{label: code for code, label in enumerate(labels)}
+                                  for labels in observations.reading_labels]
+    for name in observations.data:
+        column = small[f"log_{name}"]
+        observations.data[name] = np.zeros(max(len(column), len(observations.data[name])), dtype=column.dtype)
+        observations.data[name][:len(column)] = column
+    observations.length = len(small['log_row'])
+    for index in np.flatnonzero(observations.latest_mask()):
+        key = (int(observations.data['row'][index]), int(observations.data['col'][index]),
+               int(observations.data['sensor'][index]))
+        observations.latest[key] = int(index)
+
+    game.score = meta['score']
+    game.game_over = meta['game_over']
+    # A saved fork stays a fork: it must not survey or excavate the real artifact
+    game.hypothetical = meta.get('hypothetical', False)
+    game.survey_count = meta['survey_count']
+    game.survey_history = meta['survey_history']
+    game.displayed = game._displayed_probabilities()
+    return game
+
+
+def write_npz(path, arrays: dict):
+    """
+    Same as np.savez, but each member's data starts on a 64-byte boundary of
+    the file, so memory maps of it are aligned like in-memory arrays (numpy's
+    SIMD reductions, and so the bits of a sum, depend on alignment)
+    """
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for name, array in arrays.items():
+            array = np.asanyarray(array)
+            info = zipfile.ZipInfo(name + ".npy", date_time=(1980, 1, 1, 0, 0, 0))
+            # Local header: 30 bytes, file name, padding record, 20-byte zip64 record,
+            # then the .npy header, which numpy pads to a multiple of 64 bytes
+            start = archive.fp.tell() + 30 + len(info.filename) + 4 + 20
+            padding = -start % ALIGNMENT
+            info.extra = struct.pack('<HH', PADDING_ID, padding) + bytes(padding)
+            with archive.open(info, 'w', force_zip64=True) as f:
+                np.lib.format.write_array(f, array, allow_pickle=False)
+
+
+def memory_map(path, names) -> dict:
+    """
+    Return copy-on-write memory maps of .npy members stored uncompressed in a .npz
+    """
+    maps = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as f:
+        for name in names:
+            info = archive.getinfo(name + ".npy")
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{name} is compressed and can't be memory-mapped")
+
+            # Local file header: 30 bytes, then the file name and extra field
+            f.seek(info.header_offset + 26)
+            name_length, extra_length = np.frombuffer(f.read(4), dtype='<u2')
+            f.seek(info.header_offset + 30 + int(name_length) + int(extra_length))
+
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+            maps[name] = np.memmap(path, dtype=dtype, mode='c', offset=f.tell(), shape=shape,
+                                   order='F' if fortran else 'C')
+    return maps
@@ -0,0 +1,70 @@
+import zlib
+import numpy as np
+
+UNIFORM_BATCH = 64
+
+# First spawn key of each stream under a game's root SeedSequence
+ARTIFACT = 0
+SENSOR = 1
+POLICY = 2
+
+
+class RandomStream:
+    """
+    Generator of uniforms in [0, 1) served from pre-drawn batches. Batching
+    doesn't change the values: they are the generator's random() stream
+    """
+    def __init__(self, seed_sequence: np.random.SeedSequence, batch: int = UNIFORM_BATCH):
+        self.seed_sequence = seed_sequence
+        self.generator = np.random.Generator(np.random.PCG64(seed_sequence))
+        self.batch = batch
+        self.buffer = np.empty(0)
+        self.index = 0
+
+
+    def random(self, size=None):
+        """
+        Same as Generator.random(size)
+        """
+        count = 1 if size is None else int(np.prod(size))
+        if self.index + count > len(self.buffer):
+            rest = self.buffer[self.index:]
+            self.buffer = np.concatenate([rest, self.generator.random(max(self.batch, count - len(rest)))])
+            self.index = 0
+
+        values = self.buffer[self.index:self.index + count]
+        self.index += count
+        if size is None:
+            return float(values[0])
+        return values.reshape(size)
+
+
+class GameStreams:
+    """
+    Seed hierarchy of one game: game seed -> artifact, one stream per sensor
+    type and policy. Children are addressed by spawn key rather than spawned
+    in order, so each stream only depends on the game seed and its name, never
+    on which other streams exist or how games are split across processes
+    """
+    def __init__(self, seed=None):
+        self.seed = seed
+        self.root = np.random.SeedSequence(seed)
+
+
+    def child(self, *key) -> np.random.SeedSequence:
+        return np.random.SeedSequence(self.root.entropy, spawn_key=self.root.spawn_key + key)
+
+
+    def artifact(self) -> np.random.Generator:
+        """Generator of the artifact location"""
+        return np.random.default_rng(self.child(ARTIFACT))
+
+
+    def sensor(self, sensor_type: str, batch: int = UNIFORM_BATCH) -> RandomStream:
+        """Uniform stream of a sensor's readings"""
+        return RandomStream(self.child(SENSOR, zlib.crc32(sensor_type.encode())), batch)
+
+
+    def policy(self) -> np.random.Generator:
+        """Generator for the decisions of a policy playing this game"""
+        return np.random.default_rng(self.child(POLICY))
@@ -0,0 +1,78 @@
+"""
+Per-survey latency: GameLogic.survey end to end (sensor reading, vectorized
+likelihood, posterior update and normalization) vs. the same update with the
+Python double-loop likelihood it replaced. Both posteriors are checked equal.
+
+Usage: python src/game/benchmarks/likelihood.py [--sizes 10 50 100 200] [--repeat 5]
+"""
+import sys
+import os
+import argparse
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from backend.grid import Grid
+from backend.gamelogic import GameLogic
+
+
+def loop_likelihood(grid: Grid, obs_row: int, obs_col: int, sensor_type: str, reading: str) -> np.ndarray:
+    """
+    Reference implementation: one CPT lookup per cell
+    """
+    likelihood = np.ones((grid.rows, grid.columns))
+    sensor = grid.sensors[sensor_type]
+
+    for i in range(grid.rows):
+        for j in range(grid.columns):
+            distance = abs(i - obs_row) + abs(j - obs_col)
+            likelihood[i, j] = sensor.get_conditional_probability(distance, reading)
+
+    return likelihood
+
+
+def loop_survey(probabilities: np.ndarray, grid: Grid, obs_row: int, obs_col: int,
+                sensor_type: str, reading: str) -> np.ndarray:
+    """
+    Reference survey update: the loop likelihood times the posterior, normalized
+    """
+    posterior = probabilities * loop_likelihood(grid, obs_row, obs_col, sensor_type, reading)
+    return posterior / np.sum(posterior)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 100, 200])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'grid':>10} {'loop (ms)':>12} {'survey (ms)':>12} {'speedup':>10}")
+    rng = np.random.default_rng(0)
+    for size in args.sizes:
+        game = GameLogic(size, size, 42, 10 ** 9)
+        # Distinct cells: a repeated (cell, sensor) would replace its previous reading
+        cells = rng.choice(size * size, min(args.repeat, size * size), replace=False)
+
+        loop_times, survey_times = [], []
+        for cell in cells:
+            row, col = divmod(int(cell), size)
+            before = game.grid.probabilities.copy()
+
+            start = time.perf_counter()
+            reading = game.survey(row, col, "GPR")[0]
+            survey_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            expected = loop_survey(before, game.grid, row, col, "GPR", reading)
+            loop_times.append(time.perf_counter() - start)
+
+            if not np.allclose(expected, game.grid.probabilities, rtol=1e-9, atol=0):
+                raise AssertionError(f"Posterior mismatch on {size}x{size} grid")
+
+        loop, survey = np.median(loop_times), np.median(survey_times)
+        print(f"{size:>4}x{size:<5} {loop * 1e3:>12.3f} {survey * 1e3:>12.3f} {loop / survey:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
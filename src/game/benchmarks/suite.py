@@ -0,0 +1,186 @@
+"""
+Benchmark suite for the backend hot paths.
+
+Usage: python src/game/benchmarks/suite.py [--sizes 4 50 200 1000] [--output results.json]
+                                           [--baseline baseline.json] [--threshold 0.2]
+
+Every case runs over the grid-size sweep and reports median/p95 wall time and
+peak traced memory. With --baseline, cases slower than baseline by more than
+--threshold (relative median) are flagged and the exit status is 1.
+"""
+import sys
+import os
+import argparse
+import json
+import platform
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from backend.grid import Grid
+from backend.gamelogic import GameLogic
+from backend.observations import Observations
+from backend.bayesian import BayesianInference
+
+SENSORS = ["GPR", "MAG", "VIS"]
+DEFAULT_SIZES = [4, 10, 50, 200, 1000]
+OBSERVATION_COUNTS = [1, 10, 100, 1000]
+
+
+def measure(func, repeat: int) -> dict:
+    """
+    Time `repeat` calls of func() and trace the peak memory of one extra call
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "median_ms": float(np.median(timings)) * 1e3,
+        "p95_ms": float(np.percentile(timings, 95)) * 1e3,
+        "peak_kb": peak / 1024,
+        "repeat": repeat,
+    }
+
+
+def random_observations(grid: Grid, count: int, rng) -> Observations:
+    """
+    Return `count` sensor readings taken at random cells of `grid`
+    """
+    observations = Observations(grid.sensors)
+    for _ in range(count):
+        row, col = int(rng.integers(grid.rows)), int(rng.integers(grid.columns))
+        sensor_type = SENSORS[rng.integers(len(SENSORS))]
+        reading = grid.sensors[sensor_type].get_reading(abs(row - grid.A.x) + abs(col - grid.A.y))
+        observations.add_observation(row, col, sensor_type, reading)
+    return observations
+
+
+def add_reading(bayesian: BayesianInference, observations: Observations, rng) -> np.ndarray:
+    """
+    Take one more random reading and compute the new posterior
+    """
+    grid = bayesian.grid
+    row, col = int(rng.integers(grid.rows)), int(rng.integers(grid.columns))
+    sensor_type = SENSORS[rng.integers(len(SENSORS))]
+    reading = grid.sensors[sensor_type].get_reading(abs(row - grid.A.x) + abs(col - grid.A.y))
+    observations.add_observation(row, col, sensor_type, reading)
+    return bayesian.compute_posterior(observations)
+
+
+def play_game(size: int, budget: int, rng) -> int:
+    """
+    Play one game surveying random cells with VIS, then excavate the most likely cell
+    """
+    game = GameLogic(size, size, int(rng.integers(1 << 31)), budget)
+    while game.budget > 0:
+        game.survey(int(rng.integers(size)), int(rng.integers(size)), "VIS")
+    row, col = np.unravel_index(np.argmax(game.get_probability_grid()), (size, size))
+    game.excavate(int(row), int(col))
+    return game.survey_count
+
+
+def run_suite(sizes, repeat: int) -> dict:
+    rng = np.random.default_rng(0)
+    results = {}
+
+    for size in sizes:
+        runs = max(3, repeat if size <= 200 else repeat // 5)
+        results[f"set_grid/{size}"] = measure(lambda: Grid().set_grid(size, size), runs)
+
+        game = GameLogic(size, size, 42, 10 ** 9)
+        results[f"survey/{size}"] = measure(
+            lambda: game.survey(int(rng.integers(size)), int(rng.integers(size)), "GPR"), runs)
+        results[f"get_probability_grid/{size}"] = measure(lambda: game.get_probability_grid(), runs)
+
+        # The log engine, so that 1000 readings can't underflow the product.
+        # compute_posterior cases rebuild from the prior, the cached ones add
+        # a reading per call on top of the previous set
+        bayesian = BayesianInference(game.grid, "log")
+        cached = BayesianInference(game.grid, "log", cache_bytes=64 << 20)
+        for count in OBSERVATION_COUNTS:
+            if count * size * size > 5 * 10 ** 8:
+                continue
+            observations = random_observations(game.grid, count, rng)
+            results[f"compute_posterior/{size}/{count}obs"] = measure(
+                lambda: bayesian.compute_posterior(observations), max(3, runs // 4))
+
+            cached.compute_posterior(observations)
+            results[f"compute_posterior_cached/{size}/{count}obs"] = measure(
+                lambda: add_reading(cached, observations, rng), max(3, runs // 4))
+
+        if size <= 200:
+            start = time.perf_counter()
+            games = 0
+            while time.perf_counter() - start < 1.0:
+                play_game(size, 20, rng)
+                games += 1
+            elapsed = time.perf_counter() - start
+            results[f"full_game/{size}"] = {"games_per_s": games / elapsed, "games": games}
+
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """
+    Return the cases whose median (or throughput) regressed beyond `threshold`
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if "median_ms" in current:
+            change = current["median_ms"] / previous["median_ms"] - 1.0
+        else:
+            change = previous["games_per_s"] / current["games_per_s"] - 1.0
+        if change > threshold:
+            regressions.append((name, change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results of a previous run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = run_suite(args.sizes, args.repeat)
+    report = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for name, change in regressions:
+            print(f"REGRESSION {name}: {change * 100:+.1f}%", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,166 +1,579 @@
+import queue
+import numpy as np
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import ttk, messagebox, scrolledtext
 from backend.gamelogic import GameLogic
+from backend.pyramid import ProbabilityPyramid
+from backend.profiling import PROFILER, profiled
 
-class ClickableGrid(tk.Frame):
+CELL_WIDTH = 120
+CELL_HEIGHT = 130
+CELL_PAD = 5
+MAX_GRID_SIZE = 500
+CARD_GRID_LIMIT = 100  # larger boards are only shown as a heatmap
+HEATMAP_SIZE = 640
+POLL_INTERVAL_MS = 50
+ZOOM_STEP = 1.25
+MAX_ZOOM = 64  # pixels per cell
+SENSORS = ['GPR', 'MAG', 'VIS']
+
+CELL_COLORS = {
+    'normal': '#f8f9fa',
+    'hover': '#e9ecef',
+    'selected': '#d0e7ff',
+    'found': '#d4edda',
+    'missed': '#f8d7da',
+}
+
+# Heatmap color stops, from zero to the peak probability
+HEATMAP_COLORS = np.array([
+    [248, 249, 250],
+    [255, 237, 160],
+    [254, 178, 76],
+    [240, 59, 32],
+    [128, 0, 38],
+], dtype=float)
+HEATMAP_OUTLINES = {
+    'selected': '#007bff',
+    'hover': '#666666',
+    'found': '#28a745',
+    'missed': '#dc3545',
+}
+
+
+def colormap(values, levels=256):
+    """
+    Maps values in [0, 1] to uint8 RGB through a lookup table
+    """
+    stops = np.linspace(0.0, 1.0, len(HEATMAP_COLORS))
+    samples = np.linspace(0.0, 1.0, levels)
+    table = np.stack([np.interp(samples, stops, HEATMAP_COLORS[:, k]) for k in range(3)], axis=-1)
+    table = np.round(table).astype(np.uint8)
+    index = np.clip(np.round(values * (levels - 1)), 0, levels - 1).astype(np.intp)
+    return table[index]
+
+
+CANVAS_EVENTS = ['<Button-1>', '<Motion>', '<Leave>', '<ButtonPress-3>', '<B3-Motion>',
+                 '<MouseWheel>', '<Button-4>', '<Button-5>', '<Configure>']
+
+
+def bind_canvas(canvas, handlers):
+    """
+    Binds a view's event handlers to the canvas, dropping the previous view's
+    """
+    for sequence in CANVAS_EVENTS:
+        canvas.unbind(sequence)
+    for sequence, handler in handlers.items():
+        canvas.bind(sequence, handler)
+
+
+def ppm_bytes(rgb):
     """
-    Class that creates the game grids
+    Encodes an [height, width, 3] uint8 array as a binary PPM image
     """
-    def __init__(self, master, row, col, game_logic, select_callback, **kwargs):
-        super().__init__(master, **kwargs)
-        self.row = row
-        self.col = col
+    height, width, _ = rgb.shape
+    return b"P6 %d %d 255\n" % (width, height) + np.ascontiguousarray(rgb).tobytes()
+
+
+class CanvasGrid:
+    """
+    Draws the game grid as canvas items (one rectangle and five texts per cell)
+    with a single click/hover handler that maps pixel coordinates to cells
+    """
+    def __init__(self, canvas, game_logic, select_callback):
+        self.canvas = canvas
         self.game_logic = game_logic
         self.select_callback = select_callback
-        self.is_selected = False
-        
-        self.config(
-            borderwidth=2,
-            relief="ridge",
-            bg='#f8f9fa',
-            width=120,
-            height=130
-        )
-        self.grid_propagate(False)
-        
-        self.create_widgets()
-        self.update_content()
-        
-        self.bind_click_events()
-    
-    def create_widgets(self):
+        self.cells = {}
+        self.hovered = None
+        self.selected = None
+        self.marks = {}
+
+    def draw(self):
         """
-        Creates internal widgets (frames, labels, etc.)
+        Creates the canvas items of every cell
         """
-        self.content_frame = tk.Frame(self, bg='#f8f9fa')
-        self.content_frame.place(relx=0, rely=0, relwidth=1, relheight=1)
-        
-        self.header_frame = tk.Frame(self.content_frame, bg='#f8f9fa')
-        self.header_frame.pack(fill=tk.X, padx=10, pady=(10, 5))
-        
-        self.coord_label = tk.Label(
-            self.header_frame,
-            text=f"({self.row},{self.col})",
-            font=("Arial", 10, "bold"),
-            bg='#f8f9fa',
-            fg='#333333'
-        )
-        self.coord_label.pack(side=tk.LEFT)
-        
-        self.prob_label = tk.Label(
-            self.content_frame,
-            text="P: 0.0000",
-            font=("Arial", 9),
-            bg='#f8f9fa',
-            fg='#666666',
-            anchor=tk.W
-        )
-        self.prob_label.pack(fill=tk.X, padx=10, pady=(0, 5))
-        
-        self.sensor_frame = tk.Frame(self.content_frame, bg='#f8f9fa')
-        self.sensor_frame.pack(fill=tk.X, padx=10, pady=(0, 10))
-        
-        self.sensor_labels = {}
-        sensors = ['GPR', 'MAG', 'VIS']
-        
-        for sensor in sensors:
-            sensor_label = tk.Label(
-                self.sensor_frame,
-                text=f"{sensor}: None",
-                font=("Arial", 8),
-                bg='#f8f9fa',
-                fg='#666666',
-                anchor=tk.W
-            )
-            sensor_label.pack(fill=tk.X, pady=1)
-            self.sensor_labels[sensor] = sensor_label
-    
-    def bind_click_events(self):
-        """Adds click bindings to all interactive elements"""
-        self.bind('<Button-1>', self.on_click)
-        self.content_frame.bind('<Button-1>', self.on_click)
-        self.header_frame.bind('<Button-1>', self.on_click)
-        self.sensor_frame.bind('<Button-1>', self.on_click)
-        
-        self.coord_label.bind('<Button-1>', self.on_click)
-        self.prob_label.bind('<Button-1>', self.on_click)
-        for label in self.sensor_labels.values():
-            label.bind('<Button-1>', self.on_click)
-        
-        self.bind('<Enter>', self.on_enter)
-        self.bind('<Leave>', self.on_leave)
-    
+        bind_canvas(self.canvas, {
+            '<Button-1>': self.on_click,
+            '<Motion>': self.on_motion,
+            '<Leave>': self.on_leave,
+        })
+        self.canvas.delete("all")
+        self.cells.clear()
+        self.hovered = None
+        self.selected = None
+        self.marks.clear()
+
+        for i in range(self.game_logic.grid.rows):
+            for j in range(self.game_logic.grid.columns):
+                x0 = CELL_PAD + j * (CELL_WIDTH + 2 * CELL_PAD)
+                y0 = CELL_PAD + i * (CELL_HEIGHT + 2 * CELL_PAD)
+                items = {
+                    'card': self.canvas.create_rectangle(
+                        x0, y0, x0 + CELL_WIDTH, y0 + CELL_HEIGHT,
+                        fill=CELL_COLORS['normal'], outline='#c8c8c8', width=2, tags="cell"),
+                    'coord': self.canvas.create_text(
+                        x0 + 10, y0 + 10, text=f"({i},{j})", anchor=tk.NW,
+                        font=("Arial", 10, "bold"), fill='#333333', tags="cell"),
+                    'prob': self.canvas.create_text(
+                        x0 + 10, y0 + 36, anchor=tk.NW,
+                        font=("Arial", 9), fill='#666666', tags="cell"),
+                }
+                for k, sensor in enumerate(SENSORS):
+                    items[sensor] = self.canvas.create_text(
+                        x0 + 10, y0 + 62 + 20 * k, anchor=tk.NW,
+                        font=("Arial", 8), fill='#666666', tags="cell")
+                self.cells[(i, j)] = items
+                self.update_content(i, j)
+
+        self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+
+    def cell_at(self, x, y):
+        """
+        Returns the (row, col) under canvas coordinates, None between cells
+        """
+        col, dx = divmod(int(x), CELL_WIDTH + 2 * CELL_PAD)
+        row, dy = divmod(int(y), CELL_HEIGHT + 2 * CELL_PAD)
+        if not (CELL_PAD <= dx <= CELL_PAD + CELL_WIDTH and CELL_PAD <= dy <= CELL_PAD + CELL_HEIGHT):
+            return None
+        if (row, col) not in self.cells:
+            return None
+        return (row, col)
+
     def on_click(self, event):
-        """Handles click events on the grid cell"""
-        self.select_callback(self.row, self.col)
-    
-    def on_enter(self, event):
-        """Selection effect"""
-        if not self.is_selected:
-            self.config(bg='#e9ecef')
-            self.content_frame.config(bg='#e9ecef')
-            self.header_frame.config(bg='#e9ecef')
-            self.sensor_frame.config(bg='#e9ecef')
-            self.coord_label.config(bg='#e9ecef')
-            self.prob_label.config(bg='#e9ecef')
-            for label in self.sensor_labels.values():
-                label.config(bg='#e9ecef')
-    
+        """Handles click events on the grid"""
+        cell = self.cell_at(self.canvas.canvasx(event.x), self.canvas.canvasy(event.y))
+        if cell is not None:
+            self.select_callback(*cell)
+
+    def on_motion(self, event):
+        """Hover effect"""
+        cell = self.cell_at(self.canvas.canvasx(event.x), self.canvas.canvasy(event.y))
+        if cell == self.hovered:
+            return
+        previous, self.hovered = self.hovered, cell
+        if previous is not None:
+            self.refresh_style(*previous)
+        if cell is not None:
+            self.refresh_style(*cell)
+
     def on_leave(self, event):
-        """Removes selection effect"""
-        if not self.is_selected:
-            self.config(bg='#f8f9fa')
-            self.content_frame.config(bg='#f8f9fa')
-            self.header_frame.config(bg='#f8f9fa')
-            self.sensor_frame.config(bg='#f8f9fa')
-            self.coord_label.config(bg='#f8f9fa')
-            self.prob_label.config(bg='#f8f9fa')
-            for label in self.sensor_labels.values():
-                label.config(bg='#f8f9fa')
-    
-    def select(self):
-        """Select"""
-        self.is_selected = True
-        self.config(
-            bg='#d0e7ff',
-            relief="solid"
-        )
-        self.content_frame.config(bg='#d0e7ff')
-        self.header_frame.config(bg='#d0e7ff')
-        self.sensor_frame.config(bg='#d0e7ff')
-        self.coord_label.config(bg='#d0e7ff')
-        self.prob_label.config(bg='#d0e7ff')
-        for label in self.sensor_labels.values():
-            label.config(bg='#d0e7ff')
-    
-    def deselect(self):
-        """Deselect"""
-        self.is_selected = False
-        self.config(
-            bg='#f8f9fa',
-            relief="ridge"
-        )
-        self.content_frame.config(bg='#f8f9fa')
-        self.header_frame.config(bg='#f8f9fa')
-        self.sensor_frame.config(bg='#f8f9fa')
-        self.coord_label.config(bg='#f8f9fa')
-        self.prob_label.config(bg='#f8f9fa')
-        for label in self.sensor_labels.values():
-            label.config(bg='#f8f9fa')
-    
-    def update_content(self):
+        """Removes hover effect"""
+        if self.hovered is not None:
+            previous, self.hovered = self.hovered, None
+            self.refresh_style(*previous)
+
+    def select(self, row, col):
+        """Select a cell, deselecting the previous one"""
+        previous, self.selected = self.selected, (row, col)
+        if previous is not None and previous in self.cells:
+            self.refresh_style(*previous)
+        self.refresh_style(row, col)
+
+    def mark(self, row, col, style):
+        """Colors a cell permanently (excavation result)"""
+        self.marks[(row, col)] = style
+        self.refresh_style(row, col)
+
+    def refresh_style(self, row, col):
         """
-        Updates grid content
+        Recolors a cell card from its mark, selection and hover state
         """
-        pos = self.game_logic.grid.positions[self.row, self.col]
-        
+        items = self.cells.get((row, col))
+        if items is None:
+            return
+        if (row, col) in self.marks:
+            style = self.marks[(row, col)]
+        elif (row, col) == self.selected:
+            style = 'selected'
+        elif (row, col) == self.hovered:
+            style = 'hover'
+        else:
+            style = 'normal'
+        solid = style != 'normal' and style != 'hover'
+        self.canvas.itemconfigure(
+            items['card'], fill=CELL_COLORS[style],
+            outline='#333333' if solid else '#c8c8c8')
+
+    def update_content(self, row, col):
+        """
+        Updates cell texts
+        """
+        items = self.cells.get((row, col))
+        if items is None:
+            return
+        pos = self.game_logic.grid.positions[row, col]
+
         prob = pos.get_probability()
-        self.prob_label.config(text=f"P: {prob*100:.4f}%")
-        
-        sensors = ['GPR', 'MAG', 'VIS']
-        for sensor in sensors:
-            reading = pos.status.get(sensor, 'None')
-            self.sensor_labels[sensor].config(text=f"{sensor}: {reading}")
+        self.canvas.itemconfigure(items['prob'], text=f"P: {prob*100:.4f}%")
+
+        status = pos.status
+        for sensor in SENSORS:
+            reading = status.get(sensor, 'None')
+            self.canvas.itemconfigure(items[sensor], text=f"{sensor}: {reading}")
+
+    def update_all(self):
+        """
+        Updates texts of every cell
+        """
+        for (row, col) in self.cells:
+            self.update_content(row, col)
+
+    def redraw(self, cells):
+        """
+        Updates texts of the given cells
+        """
+        for row, col in cells:
+            self.update_content(row, col)
+
+
+class HeatmapView:
+    """
+    Draws the posterior as one PhotoImage: the probabilities (relative to the
+    peak) go through a vectorized colormap, are zoomed by nearest neighbor with
+    np.repeat and pushed to Tk as a single PPM image
+    """
+    def __init__(self, canvas, game_logic, select_callback):
+        self.canvas = canvas
+        self.game_logic = game_logic
+        self.select_callback = select_callback
+        self.image = None
+        self.zoom = 1
+        self.outlines = {}
+        self.hovered = None
+        self.selected = None
+        self.marks = {}
+
+    def draw(self):
+        """
+        Creates the image and the outline items
+        """
+        bind_canvas(self.canvas, {
+            '<Button-1>': self.on_click,
+            '<Motion>': self.on_motion,
+            '<Leave>': self.on_leave,
+        })
+        self.canvas.delete("all")
+        self.outlines.clear()
+        self.hovered = None
+        self.selected = None
+        self.marks.clear()
+
+        rows, cols = self.game_logic.grid.rows, self.game_logic.grid.columns
+        self.zoom = max(1, HEATMAP_SIZE // max(rows, cols))
+        self.image = tk.PhotoImage(width=cols * self.zoom, height=rows * self.zoom)
+        self.canvas.create_image(0, 0, image=self.image, anchor=tk.NW)
+        self.update_all()
+
+        self.canvas.configure(scrollregion=(0, 0, cols * self.zoom, rows * self.zoom))
+
+    def cell_at(self, x, y):
+        """
+        Returns the (row, col) under canvas coordinates
+        """
+        row, col = int(y) // self.zoom, int(x) // self.zoom
+        if 0 <= x and 0 <= y and row < self.game_logic.grid.rows and col < self.game_logic.grid.columns:
+            return (row, col)
+        return None
+
+    def on_click(self, event):
+        """Handles click events on the heatmap"""
+        cell = self.cell_at(self.canvas.canvasx(event.x), self.canvas.canvasy(event.y))
+        if cell is not None:
+            self.select_callback(*cell)
+
+    def on_motion(self, event):
+        """Hover outline"""
+        cell = self.cell_at(self.canvas.canvasx(event.x), self.canvas.canvasy(event.y))
+        if cell != self.hovered:
+            self.hovered = cell
+            self.outline('hover', cell)
+
+    def on_leave(self, event):
+        """Removes hover outline"""
+        self.hovered = None
+        self.outline('hover', None)
+
+    def select(self, row, col):
+        """Outlines the selected cell"""
+        self.selected = (row, col)
+        self.outline('selected', self.selected)
+
+    def mark(self, row, col, style):
+        """Outlines a cell permanently (excavation result)"""
+        self.marks[(row, col)] = style
+        self.outline(style, (row, col))
+
+    def outline(self, style, cell):
+        """
+        Moves the outline rectangle of a style onto a cell, or hides it
+        """
+        item = self.outlines.get(style)
+        if item is None:
+            item = self.canvas.create_rectangle(
+                0, 0, 0, 0, outline=HEATMAP_OUTLINES[style], width=2, state=tk.HIDDEN)
+            self.outlines[style] = item
+        if cell is None:
+            self.canvas.itemconfigure(item, state=tk.HIDDEN)
+            return
+        row, col = cell
+        self.canvas.coords(item, col * self.zoom, row * self.zoom,
+                           (col + 1) * self.zoom, (row + 1) * self.zoom)
+        self.canvas.itemconfigure(item, state=tk.NORMAL)
+        self.canvas.tag_raise(item)
+
+    @profiled("gui.heatmap")
+    def update_all(self):
+        """
+        Recolors the whole board in one image update
+        """
+        probabilities = self.game_logic.get_probability_grid()
+        peak = probabilities.max()
+        rgb = colormap(probabilities / peak if peak > 0 else probabilities)
+        rgb = rgb.repeat(self.zoom, axis=0).repeat(self.zoom, axis=1)
+        self.image.configure(data=ppm_bytes(rgb), format="PPM")
+
+    def redraw(self, cells):
+        """
+        Any change rescales the colormap, so the whole image is refreshed
+        """
+        if cells:
+            self.update_all()
+
+
+class TiledView:
+    """
+    Zoomable view backed by a ProbabilityPyramid. Each frame picks the level
+    whose pooled cells span at least one pixel and colors only the part of it
+    inside the viewport by probability mass, so a frame costs the same on any
+    board size. The wheel zooms around the cursor and the right button pans
+    """
+    def __init__(self, canvas, game_logic, select_callback):
+        self.canvas = canvas
+        self.game_logic = game_logic
+        self.select_callback = select_callback
+        self.pyramid = None
+        self.image = None
+        self.info = None
+        self.zoom = 1.0  # pixels per cell
+        self.origin = [0.0, 0.0]  # (row, col) at the viewport's top-left corner
+        self.drag = None
+        self.render_scheduled = False
+        self.hovered = None
+        self.hover_item = None
+        self.selected = None
+        self.marks = {}
+
+    def draw(self):
+        """
+        Builds the pyramid and fits the whole board in the viewport
+        """
+        bind_canvas(self.canvas, {
+            '<Button-1>': self.on_click,
+            '<Motion>': self.on_motion,
+            '<Leave>': self.on_leave,
+            '<ButtonPress-3>': self.start_pan,
+            '<B3-Motion>': self.pan,
+            '<MouseWheel>': self.on_wheel,
+            '<Button-4>': self.on_wheel,
+            '<Button-5>': self.on_wheel,
+            '<Configure>': lambda event: self.schedule_render(),
+        })
+        self.canvas.delete("all")
+        self.canvas.configure(scrollregion=(0, 0, 0, 0))
+        self.canvas.xview_moveto(0)
+        self.canvas.yview_moveto(0)
+        self.hovered = None
+        self.selected = None
+        self.marks.clear()
+
+        self.game_logic.pop_changed_box()
+        self.pyramid = ProbabilityPyramid(self.game_logic.grid.probabilities)
+
+        width, height = self.viewport()
+        self.zoom = self.min_zoom()
+        self.origin = [(self.game_logic.grid.rows - height / self.zoom) / 2,
+                       (self.game_logic.grid.columns - width / self.zoom) / 2]
+
+        self.image = tk.PhotoImage(width=width, height=height)
+        self.canvas.create_image(0, 0, image=self.image, anchor=tk.NW)
+        self.hover_item = self.canvas.create_rectangle(
+            0, 0, 0, 0, outline=HEATMAP_OUTLINES['hover'], width=2, state=tk.HIDDEN, tags="hover")
+        self.info = self.canvas.create_text(
+            8, 8, anchor=tk.NW, font=("Arial", 9), fill='#333333', tags="overlay")
+        self.render()
+
+    def viewport(self):
+        """Canvas size in pixels, before it is mapped too"""
+        width, height = self.canvas.winfo_width(), self.canvas.winfo_height()
+        if width <= 1 or height <= 1:
+            return HEATMAP_SIZE, HEATMAP_SIZE
+        return width, height
+
+    def min_zoom(self):
+        """Zoom that fits the whole board"""
+        width, height = self.viewport()
+        return min(width / self.game_logic.grid.columns, height / self.game_logic.grid.rows)
+
+    def schedule_render(self):
+        """Coalesces renders into one idle pass"""
+        if not self.render_scheduled:
+            self.render_scheduled = True
+            self.canvas.after_idle(self.render)
+
+    @profiled("gui.tiles")
+    def render(self):
+        """
+        Draws the pyramid level matching the zoom, cropped to the viewport
+        """
+        self.render_scheduled = False
+        width, height = self.viewport()
+        rows, cols = self.game_logic.grid.rows, self.game_logic.grid.columns
+
+        level = self.pyramid.level_for(self.zoom)
+        factor = 2 ** level
+
+        # Board cell under every pixel row and column
+        cell_rows = np.floor(self.origin[0] + np.arange(height) / self.zoom).astype(np.intp)
+        cell_cols = np.floor(self.origin[1] + np.arange(width) / self.zoom).astype(np.intp)
+        inside_rows = np.nonzero((cell_rows >= 0) & (cell_rows < rows))[0]
+        inside_cols = np.nonzero((cell_cols >= 0) & (cell_cols < cols))[0]
+
+        rgb = np.full((height, width, 3), 255, dtype=np.uint8)
+        if len(inside_rows) and len(inside_cols):
+            tile_rows = cell_rows[inside_rows] // factor
+            tile_cols = cell_cols[inside_cols] // factor
+            row0, col0 = tile_rows[0], tile_cols[0]
+            sums, _ = self.pyramid.window(level, row0, tile_rows[-1] + 1, col0, tile_cols[-1] + 1)
+            peak = sums.max()
+            colors = colormap(sums / peak if peak > 0 else sums)
+            rgb[np.ix_(inside_rows, inside_cols)] = colors[np.ix_(tile_rows - row0, tile_cols - col0)]
+
+        if self.image.width() != width or self.image.height() != height:
+            self.image.configure(width=width, height=height)
+        self.image.configure(data=ppm_bytes(rgb), format="PPM")
+
+        self.canvas.delete("outline")
+        if self.selected is not None:
+            self.outline('selected', self.selected)
+        for cell, style in self.marks.items():
+            self.outline(style, cell)
+        self.place_hover()
+
+    def place_hover(self):
+        """Moves the hover outline to the hovered cell, without re-rendering the image"""
+        if self.hovered is None:
+            self.canvas.itemconfigure(self.hover_item, state=tk.HIDDEN)
+        else:
+            self.canvas.coords(self.hover_item, *self.cell_box(self.hovered))
+            self.canvas.itemconfigure(self.hover_item, state=tk.NORMAL)
+            self.canvas.tag_raise(self.hover_item)
+        self.canvas.tag_raise("overlay")
+
+    def cell_box(self, cell):
+        """Viewport box of a cell, at least a few pixels wide"""
+        row, col = cell
+        x0 = (col - self.origin[1]) * self.zoom
+        y0 = (row - self.origin[0]) * self.zoom
+        size = max(self.zoom, 4)
+        return x0, y0, x0 + size, y0 + size
+
+    def outline(self, style, cell):
+        """Draws the outline of a cell"""
+        self.canvas.create_rectangle(
+            *self.cell_box(cell), outline=HEATMAP_OUTLINES[style], width=2, tags="outline")
+
+    def cell_at(self, x, y):
+        """
+        Returns the (row, col) under viewport coordinates
+        """
+        row = int(np.floor(self.origin[0] + y / self.zoom))
+        col = int(np.floor(self.origin[1] + x / self.zoom))
+        if 0 <= row < self.game_logic.grid.rows and 0 <= col < self.game_logic.grid.columns:
+            return (row, col)
+        return None
+
+    def on_click(self, event):
+        """Handles click events on the board"""
+        cell = self.cell_at(event.x, event.y)
+        if cell is not None:
+            self.select_callback(*cell)
+
+    def on_motion(self, event):
+        """Hover outline and the mass and peak of the pooled cell under the cursor"""
+        cell = self.cell_at(event.x, event.y)
+        if cell == self.hovered:
+            return
+        self.hovered = cell
+        if cell is None:
+            self.canvas.itemconfigure(self.info, text="")
+        else:
+            level = self.pyramid.level_for(self.zoom)
+            factor = 2 ** level
+            row, col = cell[0] // factor, cell[1] // factor
+            sums, maxes = self.pyramid.window(level, row, row + 1, col, col + 1)
+            self.canvas.itemconfigure(
+                self.info,
+                text=f"({cell[0]},{cell[1]})  {factor}x{factor} block: "
+                     f"mass {sums[0, 0]*100:.4f}%, peak {maxes[0, 0]*100:.4f}%")
+        self.place_hover()
+
+    def on_leave(self, event):
+        """Removes hover outline"""
+        self.hovered = None
+        self.canvas.itemconfigure(self.info, text="")
+        self.place_hover()
+
+    def on_wheel(self, event):
+        """Zooms around the cursor"""
+        zoom_in = event.num == 4 or getattr(event, 'delta', 0) > 0
+        zoom = self.zoom * ZOOM_STEP if zoom_in else self.zoom / ZOOM_STEP
+        zoom = min(max(zoom, self.min_zoom() / 2), MAX_ZOOM)
+
+        self.origin[0] += event.y / self.zoom - event.y / zoom
+        self.origin[1] += event.x / self.zoom - event.x / zoom
+        self.zoom = zoom
+        self.schedule_render()
+
+    def start_pan(self, event):
+        self.drag = (event.x, event.y, list(self.origin))
+
+    def pan(self, event):
+        """Drags the board with the right button"""
+        if self.drag is None:
+            return
+        x, y, origin = self.drag
+        self.origin = [origin[0] - (event.y - y) / self.zoom, origin[1] - (event.x - x) / self.zoom]
+        self.schedule_render()
+
+    def select(self, row, col):
+        """Outlines the selected cell"""
+        self.selected = (row, col)
+        self.schedule_render()
+
+    def mark(self, row, col, style):
+        """Outlines a cell permanently (excavation result)"""
+        self.marks[(row, col)] = style
+        self.schedule_render()
+
+    def update_all(self):
+        """
+        Rebuilds the pyramid
+        """
+        self.game_logic.pop_changed_box()
+        self.pyramid.rebuild(self.game_logic.grid.probabilities)
+        self.schedule_render()
+
+    def redraw(self, cells):
+        """
+        Re-pools the pyramid over the box changed by the last surveys
+        """
+        box = self.game_logic.pop_changed_box()
+        if box is not None:
+            with PROFILER.span("gui.pyramid_update"):
+                self.pyramid.update(self.game_logic.grid.probabilities, box)
+            self.schedule_render()
 
 
 class GameGUI:
@@ -176,7 +589,19 @@ class GameGUI:
         self.game_window = None
         self.selected_cell = None
         self.selected_sensor = "GPR"
-        self.cell_cards = {}  # Dicionário para armazenar os grids
+        self.board = None
+        self.views = {}
+        self.marked_cells = {}
+        self.pending_cells = set()
+        self.redraw_scheduled = False
+        
+        # Inference runs on one worker thread; its results come back through a
+        # queue polled from the Tk loop. User actions bump the generation, so
+        # discardable results computed for an older state are dropped
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.results = queue.Queue()
+        self.generation = 0
+        self.pending_tasks = 0
         
         self.create_config_window()
     
@@ -189,17 +614,17 @@ class GameGUI:
             row=0, column=0, columnspan=2, pady=(0, 20))
         
         configs = [
-            ("Rows:", "rows_var", 4),
-            ("Columns:", "cols_var", 4),
-            ("Initial Budget:", "budget_var", 100),
-            ("Random Seed:", "seed_var", 42)
+            ("Rows:", "rows_var", 4, MAX_GRID_SIZE),
+            ("Columns:", "cols_var", 4, MAX_GRID_SIZE),
+            ("Initial Budget:", "budget_var", 100, 10000),
+            ("Random Seed:", "seed_var", 42, 2**31 - 1)
         ]
         
-        for idx, (label_text, var_name, default) in enumerate(configs, 1):
+        for idx, (label_text, var_name, default, maximum) in enumerate(configs, 1):
             ttk.Label(main_frame, text=label_text).grid(row=idx, column=0, sticky=tk.W, pady=5)
             var = tk.IntVar(value=default)
             setattr(self, var_name, var)
-            spinbox = ttk.Spinbox(main_frame, from_=2, to=20, textvariable=var, width=10)
+            spinbox = ttk.Spinbox(main_frame, from_=2, to=maximum, textvariable=var, width=10)
             spinbox.grid(row=idx, column=1, sticky=tk.W, pady=5)
         
         ttk.Button(main_frame, text="Create Game", command=self.create_game).grid(
@@ -216,6 +641,9 @@ class GameGUI:
             if rows < 2 or cols < 2:
                 messagebox.showerror("Error", "Grid must be at least 2x2")
                 return
+            if rows > MAX_GRID_SIZE or cols > MAX_GRID_SIZE:
+                messagebox.showerror("Error", f"Grid must be at most {MAX_GRID_SIZE}x{MAX_GRID_SIZE}")
+                return
             
             self.game = GameLogic(rows, cols, seed, budget)
             self.root.withdraw()
@@ -241,6 +669,8 @@ class GameGUI:
         self.create_history_panel(main_container)
         
         self.create_grid()
+        
+        self.poll_results()
     
     def create_top_panel(self, parent):
         """Control panel"""
@@ -306,22 +736,39 @@ class GameGUI:
         btn_frame = ttk.Frame(action_frame)
         btn_frame.pack(fill=tk.X, pady=(0, 10))
         
-        survey_btn = ttk.Button(
+        self.survey_btn = ttk.Button(
             btn_frame,
             text="Perform Survey",
             command=self.perform_survey,
             width=20
         )
-        survey_btn.pack(side=tk.LEFT, padx=(0, 10))
+        self.survey_btn.pack(side=tk.LEFT, padx=(0, 10))
         
-        excavate_btn = ttk.Button(
+        self.excavate_btn = ttk.Button(
             btn_frame,
             text="Excavate",
             command=self.perform_excavation,
             width=20,
             style="Danger.TButton"
         )
-        excavate_btn.pack(side=tk.LEFT)
+        self.excavate_btn.pack(side=tk.LEFT, padx=(0, 10))
+        
+        suggest_btn = ttk.Button(
+            btn_frame,
+            text="Suggest Survey",
+            command=self.perform_suggestion,
+            width=20
+        )
+        suggest_btn.pack(side=tk.LEFT, padx=(0, 10))
+        
+        self.undo_btn = ttk.Button(btn_frame, text="Undo", command=self.perform_undo, width=8)
+        self.undo_btn.pack(side=tk.LEFT, padx=(0, 10))
+        
+        self.redo_btn = ttk.Button(btn_frame, text="Redo", command=self.perform_redo, width=8)
+        self.redo_btn.pack(side=tk.LEFT)
+        
+        self.progress = ttk.Progressbar(action_frame, mode="indeterminate")
+        self.progress.pack(fill=tk.X)
         
         style = ttk.Style()
         style.configure("Danger.TButton", foreground="white", background="#dc3545")
@@ -331,6 +778,27 @@ class GameGUI:
         grid_container = ttk.LabelFrame(parent, text="Archaeological Grid", padding="10")
         grid_container.pack(side=tk.TOP, fill=tk.BOTH, expand=True, pady=(0, 20))
         
+        cards_allowed = max(self.game.grid.rows, self.game.grid.columns) <= CARD_GRID_LIMIT
+        self.view_var = tk.StringVar(value="cards" if cards_allowed else "heatmap")
+        
+        view_frame = ttk.Frame(grid_container)
+        view_frame.pack(side=tk.TOP, fill=tk.X, pady=(0, 5))
+        ttk.Label(view_frame, text="View:").pack(side=tk.LEFT)
+        self.view_buttons = []
+        for text, value in [("Cards", "cards"), ("Heatmap", "heatmap"), ("Zoom", "tiles")]:
+            rb = ttk.Radiobutton(
+                view_frame,
+                text=text,
+                variable=self.view_var,
+                value=value,
+                command=self.create_grid
+            )
+            if value == "cards" and not cards_allowed:
+                rb.state(["disabled"])
+            else:
+                self.view_buttons.append(rb)
+            rb.pack(side=tk.LEFT, padx=10)
+        
         self.canvas = tk.Canvas(grid_container, bg="white", highlightthickness=0)
         
         h_scrollbar = ttk.Scrollbar(grid_container, orient=tk.HORIZONTAL, command=self.canvas.xview)
@@ -341,16 +809,15 @@ class GameGUI:
             yscrollcommand=v_scrollbar.set
         )
         
-        self.grid_frame = tk.Frame(self.canvas, bg="white")
-        self.canvas_window = self.canvas.create_window(
-            (0, 0), window=self.grid_frame, anchor=tk.NW
-        )
-        
         v_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         h_scrollbar.pack(side=tk.BOTTOM, fill=tk.X)
         self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         
-        self.grid_frame.bind("<Configure>", self.on_frame_configure)
+        self.views = {
+            'cards': CanvasGrid(self.canvas, self.game, self.select_cell),
+            'heatmap': HeatmapView(self.canvas, self.game, self.select_cell),
+            'tiles': TiledView(self.canvas, self.game, self.select_cell),
+        }
     
     def create_history_panel(self, parent):
         """Game History"""
@@ -368,61 +835,82 @@ class GameGUI:
         
         self.add_history_message("Game started. Select a cell and choose a sensor.")
     
-    def on_frame_configure(self, event):
-        """Update the scroll region"""
-        self.canvas.configure(scrollregion=self.canvas.bbox("all"))
-    
     def create_grid(self):
-        """Creates the cell grids"""
-        self.cell_cards.clear()
-        for widget in self.grid_frame.winfo_children():
-            widget.destroy()
-        
-        rows = self.game.grid.rows
-        cols = self.game.grid.columns
-        
-        for i in range(rows):
-            for j in range(cols):
-                card = ClickableGrid(
-                    self.grid_frame,
-                    row=i,
-                    col=j,
-                    game_logic=self.game,
-                    select_callback=self.select_cell
-                )
-                card.grid(row=i, column=j, padx=5, pady=5)
-                self.cell_cards[(i, j)] = card
+        """Draws the board with the selected view"""
+        if self.pending_tasks:
+            # A view draws from the arrays the worker thread may be writing
+            current = [name for name, view in self.views.items() if view is self.board]
+            if current:
+                self.view_var.set(current[0])
+            return
+        self.board = self.views[self.view_var.get()]
+        self.board.draw()
+        
+        if self.selected_cell:
+            self.board.select(*self.selected_cell)
+        for (row, col), style in self.marked_cells.items():
+            self.board.mark(row, col, style)
     
     def select_cell(self, row, col):
         """Seleciona uma célula"""
-        if self.selected_cell:
-            old_row, old_col = self.selected_cell
-            if (old_row, old_col) in self.cell_cards:
-                self.cell_cards[(old_row, old_col)].deselect()
-        
+        self.generation += 1
         self.selected_cell = (row, col)
-        if (row, col) in self.cell_cards:
-            self.cell_cards[(row, col)].select()
+        self.board.select(row, col)
         
         self.selected_cell_label.config(
             text=f"📍 Selected: ({row}, {col})",
             foreground="#007bff"
         )
-        
-        pos = self.game.grid.positions[row, col]
-        prob = pos.get_probability()
-        
-        self.update_cell_content(row, col)
     
-    def update_cell_content(self, row, col):
-        """Updates content of a specific cell"""
-        if (row, col) in self.cell_cards:
-            self.cell_cards[(row, col)].update_content()
+    def schedule_redraw(self, cells):
+        """Queues cells for redraw, coalescing them into one idle pass"""
+        self.pending_cells.update(cells)
+        if self.pending_cells and not self.redraw_scheduled:
+            self.redraw_scheduled = True
+            self.game_window.after_idle(self.redraw_pending_cells)
     
-    def update_all_cells(self):
-        """Updates content of all cells"""
-        for (row, col), card in self.cell_cards.items():
-            card.update_content()
+    @profiled("gui.redraw")
+    def redraw_pending_cells(self):
+        """Redraws the queued cells"""
+        cells, self.pending_cells = self.pending_cells, set()
+        self.redraw_scheduled = False
+        PROFILER.count("gui.redrawn_cells", len(cells))
+        self.board.redraw(cells)
+    
+    def run_in_background(self, task, on_done, discardable=True):
+        """
+        Runs task() on the worker thread and on_done(result) back on the Tk thread.
+        Discardable results are dropped if the user acted in the meantime
+        """
+        generation = self.generation
+        self.pending_tasks += 1
+        self.progress.start(10)
+        future = self.executor.submit(task)
+        future.add_done_callback(
+            lambda done: self.results.put((generation, discardable, on_done, done)))
+    
+    def poll_results(self):
+        """Delivers finished background results, then polls again"""
+        while True:
+            try:
+                generation, discardable, on_done, future = self.results.get_nowait()
+            except queue.Empty:
+                break
+            
+            self.pending_tasks -= 1
+            if self.pending_tasks == 0:
+                self.progress.stop()
+                self.survey_btn.state(["!disabled"])
+                self.excavate_btn.state(["!disabled"])
+                for button in self.view_buttons:
+                    button.state(["!disabled"])
+            
+            if future.exception() is not None:
+                messagebox.showerror("Error", f"Background task failed: {future.exception()}")
+            elif not (discardable and generation != self.generation):
+                on_done(future.result())
+        
+        self.game_window.after(POLL_INTERVAL_MS, self.poll_results)
     
     def perform_survey(self):
         """Executes survey action on selected cell"""
@@ -437,24 +925,66 @@ class GameGUI:
         row, col = self.selected_cell
         sensor_type = self.sensor_var.get()
         
-        reading, success, cost = self.game.survey(row, col, sensor_type)
+        # The game is not thread-safe: no other action until this survey lands
+        self.generation += 1
+        self.survey_btn.state(["disabled"])
+        self.excavate_btn.state(["disabled"])
+        for button in self.view_buttons:
+            button.state(["disabled"])
+        self.run_in_background(
+            lambda: self.game.survey(row, col, sensor_type),
+            lambda result: self.finish_survey(row, col, sensor_type, result),
+            discardable=False
+        )
+    
+    def finish_survey(self, row, col, sensor_type, result):
+        """Shows the outcome of a survey"""
+        reading, success = result[0], result[1]
         
         if not success:
             messagebox.showwarning("Cannot Survey", reading)
             return
         
+        cost = result[2]
         self.update_interface()
         
         message = f"Survey at ({row},{col}) with {sensor_type}: {reading} (Cost: {cost} points)"
         self.add_history_message(message)
         
-        self.selected_cell_label.config(
-            text=f"📍 Selected: ({row}, {col}) - {sensor_type}: {reading}"
-        )
+        if self.selected_cell == (row, col):
+            self.selected_cell_label.config(
+                text=f"📍 Selected: ({row}, {col}) - {sensor_type}: {reading}"
+            )
         
         if self.game.budget <= 0:
             messagebox.showwarning("Budget Depleted", "You have no more budget! You must excavate now.")
     
+    def perform_suggestion(self):
+        """Computes the most informative survey per cost in background"""
+        if self.game.game_over:
+            messagebox.showinfo("Game Over", "The game is over.")
+            return
+        
+        self.generation += 1
+        self.run_in_background(
+            lambda: self.game.recommend_survey(top=1),
+            self.finish_suggestion
+        )
+    
+    def finish_suggestion(self, ranked):
+        """Selects the suggested cell and sensor"""
+        if not ranked:
+            messagebox.showinfo("No Suggestion", "No affordable survey left.")
+            return
+        
+        best = ranked[0]
+        self.sensor_var.set(best['sensor'])
+        self.select_cell(best['row'], best['col'])
+        self.add_history_message(
+            f"Suggested survey at ({best['row']},{best['col']}) with {best['sensor']} "
+            f"(Expected gain: {best['gain']:.4f} nats)"
+        )
+    
     def perform_excavation(self):
         """Executes excavation action on selected cell"""
         if not self.selected_cell:
@@ -474,6 +1004,7 @@ class GameGUI:
         ):
             return
         
+        self.generation += 1
         success, score = self.game.excavate(row, col)
         
         self.update_interface()
@@ -486,9 +1017,7 @@ class GameGUI:
             )
             self.add_history_message(f"🚨 EXCAVATED at ({row},{col}): SUCCESS! Final Score: {score}")
             
-            if (row, col) in self.cell_cards:
-                card = self.cell_cards[(row, col)]
-                card.config(bg='#d4edda', relief="solid")
+            self.mark_cell(row, col, 'found')
         else:
             messagebox.showinfo(
                 "Game Over",
@@ -497,23 +1026,43 @@ class GameGUI:
             )
             self.add_history_message(f"🚨 EXCAVATED at ({row},{col}): FAILED! Score: 0")
             
-            if (row, col) in self.cell_cards:
-                card = self.cell_cards[(row, col)]
-                card.config(bg='#f8d7da', relief="solid")
+            self.mark_cell(row, col, 'missed')
     
+    def perform_undo(self):
+        """Takes back the last survey, refunding its cost"""
+        if self.pending_tasks:
+            return
+        self.generation += 1
+        if not self.game.undo():
+            messagebox.showinfo("Undo", "Nothing to undo.")
+            return
+        self.update_interface()
+        self.add_history_message(f"↩ Undone, budget back to {self.game.budget} points")
+    
+    def perform_redo(self):
+        """Replays the last undone survey"""
+        if self.pending_tasks:
+            return
+        self.generation += 1
+        if not self.game.redo():
+            messagebox.showinfo("Redo", "Nothing to redo.")
+            return
+        self.update_interface()
+        self.add_history_message(f"↪ Redone, budget at {self.game.budget} points")
+    
+    def mark_cell(self, row, col, style):
+        """Colors an excavated cell, in every view"""
+        self.marked_cells[(row, col)] = style
+        self.board.mark(row, col, style)
+    
+    @profiled("gui.update_interface")
     def update_interface(self):
         """Updates game interface"""
         self.budget_label.config(text=f"💰 Budget: {self.game.budget} points")
         self.score_label.config(text=f"🏆 Score: {self.game.score} points")
         self.survey_label.config(text=f"📊 Surveys: {self.game.survey_count}")
         
-        self.update_all_cells()
-        
-        if self.selected_cell:
-            row, col = self.selected_cell
-            self.select_cell(row, col)
-        
-        self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+        self.schedule_redraw(self.game.pop_dirty_cells())
     
     def add_history_message(self, message):
         """Add msg to history"""
@@ -525,6 +1074,7 @@ class GameGUI:
     def on_game_window_close(self):
         """Close gamw window"""
         if messagebox.askyesno("Quit Game", "Are you sure you want to quit?"):
+            self.executor.shutdown(wait=False, cancel_futures=True)
             self.game_window.destroy()
             self.root.quit()
     
@@ -0,0 +1,164 @@
+"""
+Load test of the game server.
+
+Usage: python src/game/loadtest.py [--clients 32] [--duration 10] [--rows 20] [--cols 20]
+                                   [--host 127.0.0.1 --port 8765 | --local]
+
+Every client opens a connection, creates a game and keeps surveying random
+cells (starting a new game when the budget runs out), asking for the status
+and the heatmap now and then. Prints requests/second and latency percentiles
+per operation. With --local, a server is started in this process first.
+"""
+import os
+import sys
+import argparse
+import asyncio
+import json
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from server import GameServer, DEFAULT_PORT, MAX_LINE
+
+SENSORS = ["GPR", "MAG", "VIS"]
+
+
+class GameClient:
+    """
+    Pipelining client: requests carry ids and responses are matched to them
+    """
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.next_id = 0
+        self.pending = {}
+        self.listener = asyncio.create_task(self.listen())
+
+
+    @classmethod
+    async def connect(cls, host: str = "127.0.0.1", port: int = DEFAULT_PORT):
+        reader, writer = await asyncio.open_connection(host, port, limit=MAX_LINE)
+        return cls(reader, writer)
+
+
+    async def listen(self):
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                break
+            response = json.loads(line)
+            future = self.pending.pop(response.get('id'), None)
+            if future is not None:
+                future.set_result(response)
+        for future in self.pending.values():
+            future.set_exception(ConnectionError("Server closed the connection"))
+
+
+    async def request(self, op: str, **params) -> dict:
+        self.next_id += 1
+        future = asyncio.get_running_loop().create_future()
+        self.pending[self.next_id] = future
+        self.writer.write(json.dumps({'id': self.next_id, 'op': op, **params}).encode() + b"\n")
+        await self.writer.drain()
+        return await future
+
+
+    async def close(self):
+        self.writer.close()
+        self.listener.cancel()
+
+
+async def play(client: GameClient, args, rng, deadline: float, latencies: dict, errors: list):
+    """
+    Keep one client busy until the deadline
+    """
+    async def timed(op, expect_error=False, **params):
+        start = time.perf_counter()
+        response = await client.request(op, **params)
+        latencies.setdefault(op, []).append(time.perf_counter() - start)
+        if not response['ok'] and not expect_error:
+            errors.append(response['error'])
+        return response
+
+    session = None
+    while time.perf_counter() < deadline:
+        if session is None:
+            response = await timed('create', rows=args.rows, columns=args.cols,
+                                   seed=int(rng.integers(1 << 31)), budget=args.budget)
+            session = response.get('session')
+            continue
+
+        # A survey fails once the budget can't pay for the sensor: end that game
+        response = await timed('survey', expect_error=True, session=session, row=int(rng.integers(args.rows)),
+                               col=int(rng.integers(args.cols)), sensor=SENSORS[rng.integers(3)])
+        if not response['ok']:
+            await timed('excavate', session=session, row=0, col=0)
+            await timed('close', session=session)
+            session = None
+        elif response['survey_count'] % 10 == 0:
+            await timed('status', session=session)
+            await timed('heatmap', session=session)
+
+
+async def load_test(args) -> dict:
+    server = None
+    if args.local:
+        server = GameServer(args.host, 0, args.workers)
+        await server.start()
+        args.port = server.port
+
+    clients = [await GameClient.connect(args.host, args.port) for _ in range(args.clients)]
+    latencies, errors = {}, []
+    start = time.perf_counter()
+    await asyncio.gather(*(play(client, args, np.random.default_rng(k), start + args.duration, latencies, errors)
+                           for k, client in enumerate(clients)))
+    elapsed = time.perf_counter() - start
+
+    stats = await clients[0].request('stats')
+    for client in clients:
+        await client.close()
+    if server is not None:
+        await server.stop()
+
+    everything = np.concatenate([np.array(v) for v in latencies.values()])
+    report = {'requests': len(everything), 'seconds': elapsed, 'requests_per_second': len(everything) / elapsed,
+              'errors': len(errors), 'server': stats, 'operations': {}}
+    for op, values in sorted(latencies.items()) + [('all', everything)]:
+        values = np.array(values) * 1e3
+        report['operations'][op] = {
+            'count': len(values),
+            'p50_ms': float(np.percentile(values, 50)),
+            'p99_ms': float(np.percentile(values, 99)),
+            'max_ms': float(values.max()),
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--local", action="store_true", help="start a server in this process")
+    parser.add_argument("--workers", type=int, default=None, help="inference threads of the local server")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10, help="seconds")
+    parser.add_argument("--rows", type=int, default=20)
+    parser.add_argument("--cols", type=int, default=20)
+    parser.add_argument("--budget", type=int, default=100)
+    parser.add_argument("--output", default=None, help="write the report as JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(load_test(args))
+
+    print(f"{'operation':<12}{'count':>8}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for op, s in report['operations'].items():
+        print(f"{op:<12}{s['count']:>8}{s['p50_ms']:>10.2f}{s['p99_ms']:>10.2f}{s['max_ms']:>10.2f}")
+    print(f"{report['requests_per_second']:.0f} requests/s, {report['errors']} errors")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,402 @@
+"""
+Headless game server: JSON lines over TCP on localhost.
+
+Usage: python src/game/server.py [--port 8765] [--workers 4] [--max-mb 512]
+                                 [--max-sessions 10000] [--idle-timeout 600]
+
+Each request is one JSON object per line with an "op" and an optional "id"
+that is echoed back (responses on a connection may arrive out of order):
+
+    {"id": 1, "op": "create", "rows": 10, "columns": 10, "seed": 42, "budget": 100}
+    {"id": 2, "op": "survey", "session": "...", "row": 3, "col": 4, "sensor": "GPR"}
+    {"id": 3, "op": "excavate", "session": "...", "row": 3, "col": 4}
+    {"id": 4, "op": "status", "session": "..."}
+    {"id": 5, "op": "heatmap", "session": "..."}
+    {"id": 6, "op": "undo", "session": "..."}
+    {"id": 7, "op": "redo", "session": "..."}
+    {"id": 8, "op": "fork", "session": "..."}
+    {"id": 9, "op": "assume", "session": "...", "row": 3, "col": 4, "sensor": "VIS", "reading": "..."}
+    {"id": 10, "op": "close", "session": "..."}
+    {"id": 11, "op": "stats"}
+
+Responses carry "ok": true and the results, or "ok": false and an "error".
+A fork is a new session branching off a game: readings are assumed on it,
+without spending budget, to see what the board would look like.
+Game work runs on a thread pool, one operation at a time per session, so the
+event loop keeps serving. Sessions live in an LRU table bounded by count and
+by an estimate of their memory, and expire after an idle timeout.
+"""
+import os
+import sys
+import argparse
+import asyncio
+import json
+import secrets
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from backend.gamelogic import GameLogic
+
+DEFAULT_PORT = 8765
+MAX_LINE = 1 << 20
+# Bytes per cell of the arrays counted by game_nbytes: probabilities, priors,
+# displayed, Bayesian prior and belief in float64, one int8 reading per sensor
+CELL_BYTES = 5 * 8 + 3
+
+
+def game_nbytes(game: GameLogic) -> int:
+    """
+    Estimate the memory held by a game's arrays
+    """
+    arrays = [game.grid.probabilities, game.grid.priors, game.grid.readings, game.displayed,
+              game.bayesian.prior, game.bayesian.belief.values]
+    arrays += list(game.bayesian.likelihood_tables.values())
+    arrays += list(game.observations.data.values())
+    cache = game.bayesian.cache
+    states = sum(state.nbytes for state in game.undo_states) + sum(state.nbytes for state in game.redo_states)
+    return sum(array.nbytes for array in arrays) + states + (cache.nbytes if cache is not None else 0)
+
+
+class Session:
+    def __init__(self, game: GameLogic):
+        self.game = game
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+        self.nbytes = game_nbytes(game)
+
+
+class SessionTable:
+    """
+    LRU table of sessions, bounded by count and total estimated bytes.
+    Sessions idle for longer than `idle_timeout` seconds are dropped by expire()
+    """
+    def __init__(self, max_sessions: int = 10000, max_bytes: int = 512 << 20, idle_timeout: float = 600):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.idle_timeout = idle_timeout
+        self.sessions = OrderedDict()
+        self.nbytes = 0
+        self.evicted = 0
+        self.expired = 0
+
+
+    def add(self, game: GameLogic) -> str:
+        session = Session(game)
+        if session.nbytes > self.max_bytes:
+            raise ValueError(f"The game needs {session.nbytes} bytes, over the {self.max_bytes} bytes of the session table")
+        session_id = secrets.token_hex(8)
+        self.sessions[session_id] = session
+        self.nbytes += session.nbytes
+        self._evict(keep=session_id)
+        return session_id
+
+
+    def get(self, session_id: str) -> Session:
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise KeyError(f"Unknown or expired session: {session_id}")
+        self.sessions.move_to_end(session_id)
+        session.last_used = time.monotonic()
+        return session
+
+
+    def resize(self, session_id: str):
+        """
+        Refresh the memory estimate of a session after it changed. Its oldest
+        undo states are dropped while it alone is over the cap; if that isn't
+        enough the session is closed and ValueError raised
+        """
+        session = self.sessions.get(session_id)
+        if session is None:
+            return
+        nbytes = game_nbytes(session.game)
+        while nbytes > self.max_bytes and session.game.undo_states:
+            session.game.undo_states.popleft()
+            nbytes = game_nbytes(session.game)
+        if nbytes > self.max_bytes:
+            self.remove(session_id)
+            raise ValueError(f"Session {session_id} outgrew the {self.max_bytes} bytes of the session table "
+                             f"and was closed")
+        self.nbytes += nbytes - session.nbytes
+        session.nbytes = nbytes
+        self._evict(keep=session_id)
+
+
+    def remove(self, session_id: str) -> bool:
+        session = self.sessions.pop(session_id, None)
+        if session is None:
+            return False
+        self.nbytes -= session.nbytes
+        return True
+
+
+    def expire(self):
+        """
+        Drop the sessions idle for longer than the timeout
+        """
+        deadline = time.monotonic() - self.idle_timeout
+        while self.sessions:
+            session_id, session = next(iter(self.sessions.items()))
+            if session.last_used > deadline:
+                break
+            self.remove(session_id)
+            self.expired += 1
+
+
+    def _evict(self, keep: str = None):
+        while self.sessions and (len(self.sessions) > self.max_sessions or self.nbytes > self.max_bytes):
+            session_id = next(iter(self.sessions))
+            if session_id == keep:
+                break
+            self.remove(session_id)
+            self.evicted += 1
+
+
+class GameServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT, workers: int = None,
+                 sessions: SessionTable = None):
+        self.host = host
+        self.port = port
+        self.executor = ThreadPoolExecutor(workers)
+        self.sessions = sessions if sessions is not None else SessionTable()
+        self.requests = {}
+        self.server = None
+        self.sweeper = None
+        self.operations = {
+            'create': self.create,
+            'survey': self.survey,
+            'excavate': self.excavate,
+            'status': self.status,
+            'heatmap': self.heatmap,
+            'undo': self.undo,
+            'redo': self.redo,
+            'fork': self.fork,
+            'assume': self.assume,
+            'close': self.close,
+            'stats': self.stats,
+        }
+
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port, limit=MAX_LINE)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.sweeper = asyncio.create_task(self.sweep())
+
+
+    async def stop(self):
+        self.sweeper.cancel()
+        self.server.close()
+        await self.server.wait_closed()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+    async def serve_forever(self):
+        await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+
+    async def sweep(self):
+        """
+        Expire idle sessions periodically
+        """
+        while True:
+            await asyncio.sleep(max(self.sessions.idle_timeout / 4, 0.1))
+            self.sessions.expire()
+
+
+    async def handle_connection(self, reader, writer):
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                task = asyncio.create_task(self.respond(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        except asyncio.CancelledError:
+            # Server shutting down
+            return
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            writer.close()
+
+
+    async def respond(self, line: bytes, writer):
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("Request must be a JSON object")
+            request_id = request.get('id')
+            operation = self.operations.get(request.get('op'))
+            if operation is None:
+                raise ValueError(f"Unknown operation: {request.get('op')}")
+            self.requests[request['op']] = self.requests.get(request['op'], 0) + 1
+            response = await operation(request)
+            response['ok'] = True
+        except KeyError as error:
+            # str() of a KeyError is the repr of its key
+            response = {'ok': False, 'error': str(error.args[0]) if error.args else "Missing key"}
+        except (ValueError, TypeError, IndexError) as error:
+            response = {'ok': False, 'error': str(error)}
+        except Exception as error:
+            # Whatever went wrong, the client still gets an answer to its id
+            response = {'ok': False, 'error': f"Internal error: {type(error).__name__}: {error}"}
+        response['id'] = request_id
+
+        writer.write(json.dumps(response).encode() + b"\n")
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+
+    async def run(self, session: Session, func, *args):
+        """
+        Run a game call on the executor, one at a time per session
+        """
+        async with session.lock:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+
+    async def create(self, request):
+        rows, columns = int(request['rows']), int(request['columns'])
+        if rows < 1 or columns < 1:
+            raise ValueError("The grid needs at least one cell")
+        # Refuse before allocating anything: one huge board could exhaust the memory
+        if rows * columns * CELL_BYTES > self.sessions.max_bytes:
+            raise ValueError(f"A {rows}x{columns} game needs about {rows * columns * CELL_BYTES} bytes, "
+                             f"over the {self.sessions.max_bytes} bytes of the session table")
+        game = await asyncio.get_running_loop().run_in_executor(
+            self.executor, GameLogic, rows, columns, int(request.get('seed', 42)),
+            int(request.get('budget', 100)), request.get('engine', 'linear'))
+        return {'session': self.sessions.add(game)}
+
+
+    async def survey(self, request):
+        session_id = request['session']
+        session = self.sessions.get(session_id)
+        row, col, sensor = self._cell(session, request) + (request['sensor'],)
+        if sensor not in session.game.grid.sensors:
+            raise ValueError(f"Unknown sensor: {sensor}")
+
+        result = await self.run(session, session.game.survey, row, col, sensor)
+        if not result[1]:
+            raise ValueError(result[0])
+        self.sessions.resize(session_id)
+        return {'reading': result[0], 'cost': result[2], 'budget': session.game.budget,
+                'survey_count': session.game.survey_count}
+
+
+    async def excavate(self, request):
+        session = self.sessions.get(request['session'])
+        row, col = self._cell(session, request)
+        if session.game.game_over:
+            raise ValueError("Game Over")
+        found, score = await self.run(session, session.game.excavate, row, col)
+        return {'found': found, 'score': score}
+
+
+    async def status(self, request):
+        session = self.sessions.get(request['session'])
+        status = await self.run(session, session.game.get_status)
+        if not status['game_over']:
+            del status['artifact_location']
+        return {key: [int(v) for v in value] if isinstance(value, tuple) else value
+                for key, value in status.items()}
+
+
+    async def heatmap(self, request):
+        session = self.sessions.get(request['session'])
+        probabilities = await self.run(session, session.game.get_probability_grid)
+        return {'probabilities': probabilities.tolist()}
+
+
+    async def undo(self, request):
+        session_id = request['session']
+        session = self.sessions.get(session_id)
+        undone = await self.run(session, session.game.undo)
+        self.sessions.resize(session_id)
+        return {'undone': undone, 'budget': session.game.budget, 'survey_count': session.game.survey_count}
+
+
+    async def redo(self, request):
+        session_id = request['session']
+        session = self.sessions.get(session_id)
+        redone = await self.run(session, session.game.redo)
+        self.sessions.resize(session_id)
+        return {'redone': redone, 'budget': session.game.budget, 'survey_count': session.game.survey_count}
+
+
+    async def fork(self, request):
+        session = self.sessions.get(request['session'])
+        if session.game.game_over:
+            raise ValueError("Game Over")
+        branch = await self.run(session, session.game.fork)
+        return {'session': self.sessions.add(branch)}
+
+
+    async def assume(self, request):
+        session_id = request['session']
+        session = self.sessions.get(session_id)
+        row, col, sensor = self._cell(session, request) + (request['sensor'],)
+        if sensor not in session.game.grid.sensors:
+            raise ValueError(f"Unknown sensor: {sensor}")
+
+        await self.run(session, session.game.assume, row, col, sensor, request['reading'])
+        self.sessions.resize(session_id)
+        return {'max_probability': float(session.game.grid.probabilities.max())}
+
+
+    async def close(self, request):
+        return {'closed': self.sessions.remove(request['session'])}
+
+
+    async def stats(self, request):
+        return {
+            'sessions': len(self.sessions.sessions),
+            'bytes': self.sessions.nbytes,
+            'evicted': self.sessions.evicted,
+            'expired': self.sessions.expired,
+            'requests': dict(self.requests),
+        }
+
+
+    @staticmethod
+    def _cell(session: Session, request) -> tuple:
+        row, col = int(request['row']), int(request['col'])
+        grid = session.game.grid
+        if not (0 <= row < grid.rows and 0 <= col < grid.columns):
+            raise IndexError(f"Cell ({row}, {col}) is off the board")
+        return row, col
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=None, help="inference threads")
+    parser.add_argument("--max-sessions", type=int, default=10000)
+    parser.add_argument("--max-mb", type=float, default=512, help="memory cap of the sessions")
+    parser.add_argument("--idle-timeout", type=float, default=600, help="seconds")
+    args = parser.parse_args()
+
+    sessions = SessionTable(args.max_sessions, int(args.max_mb * (1 << 20)), args.idle_timeout)
+    server = GameServer(args.host, args.port, args.workers, sessions)
+    print(f"Serving on {args.host}:{args.port}")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
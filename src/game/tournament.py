@@ -0,0 +1,180 @@
+"""
+Headless tournament between survey policies.
+
+Usage: python src/game/tournament.py [--policies greedy random excavate] [--seeds 1000]
+                                     [--rows 10] [--cols 10] [--budget 100]
+                                     [--workers 8] [--chunk 50] [--output results.jsonl]
+                                     [--events DIR]
+
+Every policy plays the same seeded games. (policy, seed chunk) work units run
+on a process pool whose workers load the sensor config once; per-game results
+are streamed to --output as JSON lines and a summary per policy is printed.
+With --events, every worker also appends each survey and excavation to a
+binary event log DIR/events-<run>-<pid>.bin (see backend/eventlog.py), where
+<run> is the start time of the tournament, so runs never mix.
+"""
+import os
+
+# One process per core: keep numpy's thread pools from oversubscribing them
+for variable in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(variable, "1")
+
+import sys
+import argparse
+import contextlib
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from backend.config import load_config
+from backend.gamelogic import GameLogic
+from backend.eventlog import EventLog
+from backend.policies import POLICIES, observe, best_cell
+
+SETTINGS = {}
+
+
+def init_worker(settings: dict):
+    """
+    Keep the game settings and warm the config registry once per worker
+    """
+    SETTINGS.update(settings)
+    load_config(settings['config_path'])
+
+
+def open_event_log():
+    """
+    Open this worker's event log of the run, or a null context without --events
+    """
+    if not SETTINGS.get('events'):
+        return contextlib.nullcontext()
+    name = f"events-{SETTINGS.get('run_id', 'run')}-{os.getpid()}.bin"
+    return EventLog(os.path.join(SETTINGS['events'], name))
+
+
+def play_game(policy, seed: int, rows: int, columns: int, budget: int,
+              config_path=None, max_steps: int = 10000, event_log=None, game_id=None) -> dict:
+    """
+    Play one game of a policy, return its result
+    """
+    start = time.perf_counter()
+    game = GameLogic(rows, columns, seed, budget, config_path=config_path,
+                     event_log=event_log, game_id=game_id, history=0)
+    policy.reset(seed)
+
+    for _ in range(max_steps):
+        action = policy.act(observe(game))
+        if action[0] == 'excavate':
+            break
+        result = game.survey(*action[1:])
+        if not result[1]:
+            action = ('excavate',) + best_cell(game.grid.probabilities)
+            break
+    else:
+        action = ('excavate',) + best_cell(game.grid.probabilities)
+
+    found, score = game.excavate(action[1], action[2])
+    return {
+        'policy': policy.name,
+        'game_id': game.game_id,
+        'seed': seed,
+        'score': score,
+        'found': found,
+        'surveys': game.survey_count,
+        'spent': budget - game.budget,
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def play_chunk(task: tuple) -> list:
+    """
+    Play a chunk of seeds with one policy, in a worker
+    """
+    name, seeds = task
+    policy = POLICIES[name]()
+    # Game ids tell the policies apart in the event logs
+    policy_id = sorted(POLICIES).index(name)
+    # Opened per chunk so the log is flushed and closed even if a game fails
+    with open_event_log() as event_log:
+        return [play_game(policy, seed, SETTINGS['rows'], SETTINGS['columns'], SETTINGS['budget'],
+                          SETTINGS['config_path'], event_log=event_log, game_id=(policy_id << 48) | seed)
+                for seed in seeds]
+
+
+def run_tournament(policies: list, seeds: list, settings: dict, workers: int = None,
+                   chunk: int = 50, output=None) -> list:
+    """
+    Play every policy on every seed, streaming the results to `output` (a file)
+    """
+    tasks = [(name, seeds[i:i + chunk]) for name in policies for i in range(0, len(seeds), chunk)]
+    results = []
+    with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(settings,)) as executor:
+        futures = [executor.submit(play_chunk, task) for task in tasks]
+        for future in as_completed(futures):
+            for result in future.result():
+                results.append(result)
+                if output is not None:
+                    output.write(json.dumps(result) + "\n")
+            if output is not None:
+                output.flush()
+    return results
+
+
+def summarize(results: list, elapsed: float) -> dict:
+    """
+    Return {policy: mean score, hit rate, mean surveys and spend}
+    """
+    summary = {}
+    for name in sorted({result['policy'] for result in results}):
+        games = [result for result in results if result['policy'] == name]
+        summary[name] = {
+            'games': len(games),
+            'mean_score': float(np.mean([g['score'] for g in games])),
+            'hit_rate': float(np.mean([g['found'] for g in games])),
+            'mean_surveys': float(np.mean([g['surveys'] for g in games])),
+            'mean_spent': float(np.mean([g['spent'] for g in games])),
+        }
+    summary['games_per_second'] = len(results) / elapsed if elapsed > 0 else float('inf')
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--policies", nargs="+", default=["greedy", "random", "excavate"], choices=sorted(POLICIES))
+    parser.add_argument("--seeds", type=int, default=1000, help="number of seeded games per policy")
+    parser.add_argument("--first-seed", type=int, default=0)
+    parser.add_argument("--rows", type=int, default=10)
+    parser.add_argument("--cols", type=int, default=10)
+    parser.add_argument("--budget", type=int, default=100)
+    parser.add_argument("--config", default=None, help="sensor config YAML")
+    parser.add_argument("--workers", type=int, default=None, help="processes, default one per core")
+    parser.add_argument("--chunk", type=int, default=50, help="games per work unit")
+    parser.add_argument("--output", default="tournament.jsonl")
+    parser.add_argument("--events", default=None, help="directory of the binary event logs")
+    args = parser.parse_args()
+
+    settings = {'rows': args.rows, 'columns': args.cols, 'budget': args.budget,
+                'config_path': args.config, 'events': args.events,
+                'run_id': time.strftime("%Y%m%d-%H%M%S")}
+    if args.events:
+        os.makedirs(args.events, exist_ok=True)
+    seeds = list(range(args.first_seed, args.first_seed + args.seeds))
+
+    start = time.perf_counter()
+    with open(args.output, "w") as output:
+        results = run_tournament(args.policies, seeds, settings, args.workers, args.chunk, output)
+    summary = summarize(results, time.perf_counter() - start)
+
+    print(f"{'policy':<12}{'games':>8}{'score':>10}{'hit rate':>10}{'surveys':>10}{'spent':>10}")
+    for name in args.policies:
+        s = summary[name]
+        print(f"{name:<12}{s['games']:>8}{s['mean_score']:>10.2f}{s['hit_rate']:>10.3f}"
+              f"{s['mean_surveys']:>10.2f}{s['mean_spent']:>10.2f}")
+    print(f"{summary['games_per_second']:.1f} games/s, results in {args.output}")
+
+
+if __name__ == "__main__":
+    main()